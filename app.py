@@ -1,145 +1,289 @@
 import streamlit as st
-from openai import OpenAI
-from streamlit_js_eval import streamlit_js_eval
-from streamlit_mic_recorder import mic_recorder
-import os
+import asyncio
 import base64
+import json
+from app_resources import (
+    create_interview,
+    get_client,
+    get_interview_store,
+    get_model_router,
+    get_session_registry,
+    get_transcription_service,
+    init_session_state,
+    warm_up,
+)
+from interview_engine import MAX_QUESTIONS
+from metrics import metrics
+from session_memory import CandidateProfile
+from transcription import audio_hash
 
 # Setting up the Streamlit page configuration
 st.set_page_config(page_title="Interview Bot", page_icon="🤖")
 st.title("Interview Bot")
 
-# Initialize session state variables
-if "setup_complete" not in st.session_state:
-    st.session_state.setup_complete = False
-if "user_message_count" not in st.session_state:
-    st.session_state.user_message_count = 0
-if "feedback_shown" not in st.session_state:
-    st.session_state.feedback_shown = False
-if "chat_complete" not in st.session_state:
-    st.session_state.chat_complete = False
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-# New session state for controlling the flow after assistant response
-if "awaiting_user_action" not in st.session_state:
-    st.session_state.awaiting_user_action = False
-# Session state to hold the AI's last spoken text and audio path
-if "current_ai_response_text" not in st.session_state:
-    st.session_state.current_ai_response_text = ""
-if "current_ai_audio_path" not in st.session_state:
-    st.session_state.current_ai_audio_path = ""
-# Session state for feedback audio file path
-if "feedback_audio_path" not in st.session_state:
-    st.session_state.feedback_audio_path = ""
-# New session state to store initial inputs for "Restart with Same Inputs"
-if "initial_inputs" not in st.session_state:
-    st.session_state.initial_inputs = {}
-
-
-# Session state variables for initial personal information audio transcriptions
-if "name_audio_transcription" not in st.session_state:
-    st.session_state.name_audio_transcription = ""
-if "experience_audio_transcription" not in st.session_state:
-    st.session_state.experience_audio_transcription = ""
-if "skills_audio_transcription" not in st.session_state:
-    st.session_state.skills_audio_transcription = ""
-
-# New session state for temporary voice input during the chat interview
-if "current_chat_voice_input" not in st.session_state:
-    st.session_state.current_chat_voice_input = ""
+# Initialize session state variables (defaults in app_resources.SESSION_DEFAULTS)
+init_session_state()
 
 # Helper functions to update session state
 def clear_audio_files():
-    """Removes all generated audio files."""
-    audio_files = [f for f in os.listdir() if f.endswith((".mp3", ".webm")) and (f.startswith("assistant_") or f.startswith("chat_audio_") or f.startswith("audio_") or f == "feedback_summary.mp3" or f == "assistant_initial_intro.mp3")]
-    for f in audio_files:
-        try:
-            os.remove(f)
-        except Exception as e:
-            st.warning(f"Could not remove audio file {f}: {e}")
+    """Removes all audio of the current session."""
+    if st.session_state.interview is not None:
+        st.session_state.interview.close()
 
 def complete_setup():
     st.session_state.setup_complete = True
-    # Store initial inputs when setup is complete
-    st.session_state.initial_inputs = {
-        "name": st.session_state["name"],
-        "experience": st.session_state["experience"],
-        "skills": st.session_state["skills"],
-        "company": st.session_state["company"],
-        "position": st.session_state["position"],
-        "job_post": st.session_state["job_post"],
-    }
+    # Store initial inputs when setup is complete; the interview uses the same profile object
+    st.session_state.initial_inputs = CandidateProfile.from_inputs(st.session_state)
+    # The transcriptions are now in the inputs, so the separate copies are no longer needed
+    st.session_state.name_audio_transcription = ""
+    st.session_state.experience_audio_transcription = ""
+    st.session_state.skills_audio_transcription = ""
 
 def show_feedback():
     st.session_state.feedback_shown = True
 
 def reset_interview_state_for_restart():
     """Resets all interview-specific session state variables."""
-    st.session_state.user_message_count = 0
+    clear_audio_files() # Clear audio files on any restart
+    st.query_params.pop("interview", None) # The next interview gets a new ID; this one stays in the store
+    st.session_state.interview = None # Drops the messages, turn state and cached feedback of the finished interview
     st.session_state.feedback_shown = False
-    st.session_state.chat_complete = False
-    st.session_state.messages = []
-    st.session_state.awaiting_user_action = False
-    st.session_state.current_ai_response_text = ""
-    st.session_state.current_ai_audio_path = ""
-    st.session_state.feedback_audio_path = ""
     st.session_state.name_audio_transcription = "" # Clear these as they are tied to voice input in setup
     st.session_state.experience_audio_transcription = ""
     st.session_state.skills_audio_transcription = ""
-    st.session_state.current_chat_voice_input = ""
-    clear_audio_files() # Clear audio files on any restart
+    st.session_state.transcribed_inputs = {}
+    st.session_state.pending_transcriptions = {}
+    st.session_state.last_recording_report = None
 
 def restart_full():
     """Restarts the entire application, clearing all inputs and interview state."""
     reset_interview_state_for_restart()
     st.session_state.setup_complete = False # Go back to setup page
-    st.session_state.initial_inputs = {} # Clear saved inputs as well
+    st.session_state.initial_inputs = None # Clear saved inputs as well
     st.session_state["name"] = ""
     st.session_state["experience"] = ""
     st.session_state["skills"] = ""
     st.session_state["company"] = ""
     st.session_state["position"] = ""
     st.session_state["job_post"] = ""
-    # Use streamlit_js_eval to force a full browser refresh
-    streamlit_js_eval(js_expressions="parent.window.location.reload()")
+    # Use streamlit_js_eval to force a full browser refresh, without the interview ID in the URL
+    from streamlit_js_eval import streamlit_js_eval # Only needed here, so it is not imported on every page
+    streamlit_js_eval(js_expressions="parent.window.location.replace(parent.window.location.pathname)")
+
+
+def restore_initial_inputs():
+    """Restores the saved initial inputs into the current session state variables."""
+    if st.session_state.initial_inputs is not None:
+        for field, value in st.session_state.initial_inputs.to_inputs().items():
+            st.session_state[field] = value
 
 
 def restart_with_same_inputs():
     """Sends the user back to the setup page with initial input data pre-filled."""
     reset_interview_state_for_restart()
     st.session_state.setup_complete = False # IMPORTANT: Go back to setup page
+    restore_initial_inputs()
 
-    # Restore initial inputs into the current session state variables
-    if st.session_state.initial_inputs:
-        st.session_state["name"] = st.session_state.initial_inputs.get("name", "")
-        st.session_state["experience"] = st.session_state.initial_inputs.get("experience", "")
-        st.session_state["skills"] = st.session_state.initial_inputs.get("skills", "")
-        st.session_state["company"] = st.session_state.initial_inputs.get("company", "")
-        st.session_state["position"] = st.session_state.initial_inputs.get("position", "")
-        st.session_state["job_post"] = st.session_state.initial_inputs.get("job_post", "")
-    
     # Rerun to apply changes and go to the setup phase with pre-filled data
     st.rerun()
 
 
-# --- Convert text to audio ---
-def text_to_audio(client, text, audio_path, voice_type="alloy"):
-    try:
-        response = client.audio.speech.create(model="tts-1", voice=voice_type, input=text)
-        response.stream_to_file(audio_path)
-    except Exception as e:
-        st.error(f"Error converting text to audio: {e}")
-
 # --- Autoplay audio ---
-def auto_play_audio(audio_file_path):
-    if os.path.exists(audio_file_path):
-        with open(audio_file_path, "rb") as audio_file:
-            audio_bytes = audio_file.read()
+def auto_play_audio(audio_key, autoplay=True):
+    audio_bytes = st.session_state.interview.audio_store.get(audio_key)
+    if audio_bytes:
+        auto_play_audio_bytes(audio_bytes, autoplay=autoplay)
+    else:
+        st.error(f"Error: Audio not found for {audio_key}")
+
+def auto_play_audio_bytes(audio_bytes, autoplay=True):
+    # st.audio registers the clip with Streamlit's media file manager, which serves it by URL
+    # (with byte-range support) under a content-hash ID. Reruns reference the same URL instead of
+    # re-sending a base64 copy over the websocket, and the browser fetches each clip only once.
+    with metrics.timer("audio_playback_render", bytes=len(audio_bytes)):
+        st.audio(audio_bytes, format="audio/mpeg", autoplay=autoplay)
+
+# Player installed once into the parent page, so queued segments keep playing in order across reruns
+AUDIO_QUEUE_PLAYER_JS = """
+window.__interviewAudioQueue = window.__interviewAudioQueue || {
+    clips: [],
+    playing: false,
+    push: function (src) {
+        this.clips.push(src);
+        this.playNext();
+    },
+    playNext: function () {
+        if (this.playing || !this.clips.length) return;
+        this.playing = true;
+        const audio = new Audio(this.clips.shift());
+        const next = () => { this.playing = false; this.playNext(); };
+        audio.onended = next;
+        audio.onerror = next;
+        audio.play().catch(next);
+    }
+};
+"""
+
+def enqueue_audio_segment(audio_bytes, audio_area):
+    """Queues an MP3 segment for gapless, in-order playback in the browser.
+
+    Segments are only sent once, in the run that generates them; later reruns replay the joined clip via st.audio.
+    Each segment's player is added to audio_area, which must stay on the page for the rest of the run: a player
+    removed before its script has run would drop the segment.
+    """
+    with metrics.timer("audio_segment_encode", bytes=len(audio_bytes)):
         base64_audio = base64.b64encode(audio_bytes).decode("utf-8")
-        audio_html = f'<audio src="data:audio/mp3;base64,{base64_audio}" controls autoplay></audio>'
-        st.markdown(audio_html, unsafe_allow_html=True)
+    audio_area.iframe(
+        f"""<script>
+        const host = window.parent;
+        if (!host.__interviewAudioQueue) {{
+            const player = host.document.createElement("script");
+            player.textContent = {json.dumps(AUDIO_QUEUE_PLAYER_JS)};
+            host.document.head.appendChild(player);
+        }}
+        host.__interviewAudioQueue.push("data:audio/mp3;base64,{base64_audio}");
+        </script>""",
+        height="content", # The document only holds a script, so the frame takes no space
+    )
+
+
+# --- Transcribe recorded audio ---
+def start_transcription(target, audio_bytes):
+    """Submits the recorded bytes for transcription; the page keeps rendering while it runs.
+
+    Silence is trimmed and the clip is compressed in the worker before it is uploaded.
+    Long recordings are transcribed in overlapping chunks, concurrently.
+    """
+    transcription = get_transcription_service().submit_chunked(get_client(), audio_bytes, file_name=f"{target}.webm")
+    st.session_state.pending_transcriptions[target] = (transcription, audio_hash(audio_bytes))
+
+def apply_transcription(target, transcribed_text):
+    if target == "chat":
+        st.session_state.transcribed_inputs[f"chat_text_area_{st.session_state.interview.user_message_count}"] = transcribed_text
     else:
-        st.error(f"Error: Audio file not found at {audio_file_path}")
+        # Update both the transcription state and the main input state
+        setattr(st.session_state, f"{target}_audio_transcription", transcribed_text)
+        st.session_state[target] = transcribed_text # Update main input
+        st.session_state.transcribed_inputs[f"{target}_input_final"] = transcribed_text
+
+def fill_transcribed_inputs():
+    """Writes the transcribed text into its input widgets, before they are drawn in this run.
+
+    A widget with a key keeps its own value across reruns and ignores a changed value=,
+    so the text is set through the widget's key instead.
+    """
+    for widget_key, transcribed_text in st.session_state.transcribed_inputs.items():
+        st.session_state[widget_key] = transcribed_text
+    st.session_state.transcribed_inputs.clear()
+
+def finish_pending_transcriptions():
+    """Waits for in-flight transcriptions once the page has rendered, then reruns to show them.
+
+    A long recording reruns after each chunk, so its input fills in progressively.
+    """
+    pending = st.session_state.pending_transcriptions
+    if not pending:
+        return
+    with st.spinner("Transcribing..."):
+        for target, (transcription, audio_key) in list(pending.items()):
+            try:
+                if not transcription.done():
+                    transcription.wait_next()
+                    if not transcription.done():
+                        apply_transcription(target, transcription.partial_text())
+                        continue
+                apply_transcription(target, transcription.result())
+                st.session_state.last_recording_report = get_transcription_service().preprocess_report(audio_key)
+            except Exception as e:
+                st.error(f"Error transcribing {target}: {e}")
+            del pending[target]
+    st.rerun()
+
+
+# --- Interview engine ---
+def resume_interview(interview_id):
+    """Continues a stored interview in this session; returns False if there is no such interview.
+
+    An interview still live in another session, e.g. a duplicated tab, is taken over
+    with its engine, so only one engine ever appends to its saved log.
+    """
+    live = get_session_registry().claim(interview_id, st.session_state.session_id)
+    if live is not None:
+        if live is not st.session_state.interview:
+            reset_interview_state_for_restart()
+            st.session_state.interview = live
+        st.session_state.initial_inputs = live.profile
+    else:
+        stored = get_interview_store().load(interview_id)
+        if stored is None or not stored.turns:
+            return False
+        reset_interview_state_for_restart()
+        st.session_state.initial_inputs = stored.profile
+        st.session_state.interview = create_interview()
+        st.session_state.interview.restore(stored)
+    restore_initial_inputs()
+    st.session_state.setup_complete = True
+    st.query_params["interview"] = interview_id
+    return True
+
+def release_interview():
+    """Drops an interview that another session took over, without closing it: its new owner still uses it."""
+    st.session_state.interview = None
+    reset_interview_state_for_restart()
+    st.session_state.setup_complete = False
+    restore_initial_inputs()
+
+def run_async(coroutine):
+    """Runs an engine step to completion from the Streamlit script thread."""
+    return asyncio.run(coroutine)
+
+def show_interview_errors(interview):
+    """Displays and clears the non-fatal errors recorded by the engine."""
+    for error in interview.errors:
+        st.error(error)
+    interview.errors.clear()
+
+def go_to_next_question():
+    # Runs as a button callback, before the script reruns, so no extra st.rerun() is needed
+    run_async(st.session_state.interview.next_question())
+
+def finish_interview():
+    st.session_state.interview.finish()
+
+def render_history(interview):
+    # One element for the whole history instead of one per turn keeps reruns cheap as the interview grows
+    st.subheader("Conversation History")
+    st.markdown(interview.history_markdown())
+    st.markdown("---")
+
+def render_reply(interview, history_area, turn_area):
+    """Shows the new reply in this run instead of rerunning the whole script, so the segment players stay mounted."""
+    history_area.empty()
+    with history_area.container():
+        render_history(interview)
+    turn_area.empty()
+    with turn_area.container():
+        show_interview_errors(interview)
+        render_awaiting_view(interview)
+    interview.prefetch()
+
+def render_awaiting_view(interview):
+    """Case 1: Assistant has just responded, waiting for user to click "Next Question"."""
+    st.info("Please listen to the interviewer's response and click 'Next Question' when you're ready.")
+
+    if interview.current_ai_audio_key and interview.current_ai_audio_key in interview.audio_store:
+        auto_play_audio(interview.current_ai_audio_key, autoplay=interview.current_ai_audio_autoplay)
+    st.write(f"**Interviewer:** {interview.current_ai_response_text}")
+
+    # The first "Next Question" click does not count as a user turn,
+    # because the first question was from the AI directly.
+    st.button("Next Question", on_click=go_to_next_question, key="continue_interview_button")
+
+
+def mic_recorder(**kwargs):
+    """Shows the recorder component; it is imported on first use, since only voice input needs it."""
+    from streamlit_mic_recorder import mic_recorder as recorder
+    return recorder(**kwargs)
 
 
 # Function to handle audio recording and transcription for initial setup
@@ -152,44 +296,54 @@ def handle_audio_input_setup(slot_name, key):
         key=key
     )
 
-    if mic_recorder_output:
-        client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
-        audio_bytes = mic_recorder_output['bytes']
-        if audio_bytes:
-            temp_audio_file_path = f"audio_{slot_name}.webm"
-            with open(temp_audio_file_path, "wb") as f:
-                f.write(audio_bytes)
-
-            with st.spinner(f"Transcribing {slot_name}..."):
-                audio_file = open(temp_audio_file_path, "rb")
-                transcript = client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file
-                )
-                audio_file.close()
-                os.remove(temp_audio_file_path)
+    if mic_recorder_output and mic_recorder_output['bytes']:
+        start_transcription(slot_name, mic_recorder_output['bytes'])
 
-            # Update both the transcription state and the main input state
-            setattr(st.session_state, f"{slot_name}_audio_transcription", transcript.text)
-            st.session_state[slot_name] = transcript.text # Update main input
-            st.write(f"**Transcription for {slot_name}:** {transcript.text}")
-            st.rerun()
+    if slot_name in st.session_state.pending_transcriptions:
+        st.caption(f"Transcribing {slot_name}...")
     return getattr(st.session_state, f"{slot_name}_audio_transcription")
 
 
+# --- Resuming a stored interview ---
+# The interview ID is kept in the URL, so a refresh or a server restart continues the same interview
+if st.session_state.interview is None and "interview" in st.query_params:
+    if not resume_interview(st.query_params["interview"]):
+        st.query_params.pop("interview", None)
+
+
+# --- Idle interviews ---
+# Any session's rerun also sweeps interviews that nobody is using anymore
+get_session_registry().sweep_if_due()
+if st.session_state.interview is not None and st.session_state.interview.expired:
+    # An evicted interview that was saved is reloaded from the store, without its audio
+    if resume_interview(st.session_state.interview.interview_id):
+        st.info("Your interview was reloaded after a long period of inactivity.")
+    else:
+        reset_interview_state_for_restart()
+        st.session_state.setup_complete = False
+        restore_initial_inputs()
+        st.warning("Your interview was closed after a long period of inactivity. Your details are kept, so you can start again.")
+elif st.session_state.interview is not None and get_session_registry().owner(st.session_state.interview) != st.session_state.session_id:
+    # Resumed in another tab, which now drives the same engine
+    release_interview()
+    st.warning("This interview was opened in another tab and continues there. Your details are kept, so you can start again.")
+
+
+# Transcriptions that finished (or got a chunk further) in the last run fill their inputs
+fill_transcribed_inputs()
+
+
 # --- Setup Stage ---
 if not st.session_state.setup_complete:
-    st.subheader('Personal Information')
+    with st.expander("Resume a saved interview"):
+        resume_interview_id = st.text_input("Interview ID", key="resume_interview_id")
+        if st.button("Resume", key="resume_interview_button"):
+            if resume_interview(resume_interview_id.strip()):
+                st.rerun()
+            else:
+                st.warning("No saved interview with this ID.")
 
-    # Initialize session state for personal information (if not already set by restart_with_same_inputs)
-    if "name" not in st.session_state:
-        st.session_state["name"] = ""
-    if "experience" not in st.session_state:
-        st.session_state["experience"] = ""
-    if "skills" not in st.session_state:
-        st.session_state["skills"] = ""
-    if "job_post" not in st.session_state:
-        st.session_state["job_post"] = ""
+    st.subheader('Personal Information')
 
 
     # Option to input via text or voice
@@ -201,11 +355,10 @@ if not st.session_state.setup_complete:
         st.session_state["skills"] = st.text_area(label="Skills", value=st.session_state["skills"], placeholder="List your skills", max_chars=1000, key="skills_text_input")
     else: # input_method == "Speak"
         st.write("### Name")
-        # Pre-fill with existing name if available
-        initial_name_value = st.session_state["name"] if st.session_state["name"] else st.session_state.name_audio_transcription
+        # Pre-fill with existing name if available; the widget keeps its value from then on
+        st.session_state.setdefault("name_input_final", st.session_state["name"] or st.session_state.name_audio_transcription)
         st.session_state["name"] = st.text_input(
             label="Name (from audio or manual edit)",
-            value=initial_name_value,
             placeholder="Enter your name or speak it", max_chars=40,
             key="name_input_final"
         )
@@ -214,10 +367,9 @@ if not st.session_state.setup_complete:
         st.markdown("---")
 
         st.write("### Experience")
-        initial_experience_value = st.session_state["experience"] if st.session_state["experience"] else st.session_state.experience_audio_transcription
+        st.session_state.setdefault("experience_input_final", st.session_state["experience"] or st.session_state.experience_audio_transcription)
         st.session_state["experience"] = st.text_area(
             label="Experience (from audio or manual edit)",
-            value=initial_experience_value,
             placeholder="Describe your experience or speak it", max_chars=200,
             key="experience_input_final"
         )
@@ -225,10 +377,9 @@ if not st.session_state.setup_complete:
         st.markdown("---")
 
         st.write("### Skills")
-        initial_skills_value = st.session_state["skills"] if st.session_state["skills"] else st.session_state.skills_audio_transcription
+        st.session_state.setdefault("skills_input_final", st.session_state["skills"] or st.session_state.skills_audio_transcription)
         st.session_state["skills"] = st.text_area(
             label="Skills (from audio or manual edit)",
-            value=initial_skills_value,
             placeholder="List your skills or speak them", max_chars=200,
             key="skills_input_final"
         )
@@ -239,12 +390,6 @@ if not st.session_state.setup_complete:
     # Company and Position Section
     st.subheader('Company and Position')
 
-    # Initialize session state for company and position information (if not already set by restart_with_same_inputs)
-    if "position" not in st.session_state:
-        st.session_state["position"] = ""
-    if "company" not in st.session_state:
-        st.session_state["company"] = ""
-
     # Replace dropdowns and radio buttons with text inputs
     st.session_state["company"] = st.text_input(
         label="Company Name",
@@ -278,9 +423,14 @@ if not st.session_state.setup_complete:
             st.write("Setup complete. Starting interview...")
             st.rerun()
 
+    # The form is on screen; load the API client and audio libraries while the candidate fills it in
+    warm_up()
+
 
 # --- Interview Phase ---
-if st.session_state.setup_complete and not st.session_state.feedback_shown and not st.session_state.chat_complete:
+interview = st.session_state.interview
+
+if st.session_state.setup_complete and not st.session_state.feedback_shown and not (interview and interview.chat_complete):
 
     st.info(
     """
@@ -289,227 +439,158 @@ if st.session_state.setup_complete and not st.session_state.feedback_shown and n
     icon="🎤",
     )
 
-    # Initialize OpenAI client
-    client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
-
-    # Setting OpenAI model if not already initialized
-    if "openai_model" not in st.session_state:
-        st.session_state["openai_model"] = "gpt-4o"
-
-    # Initializing the system prompt for the chatbot
-    if not st.session_state.messages:
-        # Construct the system prompt with the new job_post information
-        system_prompt_content = (
-            f"You are an HR executive that interviews an interviewee called {st.session_state['name']} "
-            f"with experience: {st.session_state['experience']} and skills: {st.session_state['skills']}. "
-            f"You should interview him for the position {st.session_state['position']} "
-            f"at the company {st.session_state['company']}."
-        )
-        # Conditionally add the job post information to the prompt
-        if st.session_state["job_post"]:
-            system_prompt_content += f" The job post description is as follows: {st.session_state['job_post']}."
-
-        st.session_state.messages = [{
-            "role": "system",
-            "content": system_prompt_content
-        }]
+    if interview is None:
+        interview = st.session_state.interview = create_interview()
+        st.query_params["interview"] = interview.interview_id
+    interview.touch()
 
-        # --- Generate the FIRST question/intro from the assistant automatically ---
+    # --- Generate the FIRST question/intro from the assistant automatically ---
+    if not interview.started:
         with st.spinner("Interviewer is preparing the first question..."):
-            initial_ai_prompt_content = (
-                f"Hello {st.session_state['name']}. My name is AI HR Manager from {st.session_state['company']}."
-                f"Thank you for applying for the {st.session_state['position']} position. "
-                "To start, could you please tell me what you know about our company or why you are interested in this particular position?"
-            )
-            
-            # Add this initial question to messages
-            st.session_state.messages.append({"role": "assistant", "content": initial_ai_prompt_content})
+            run_async(interview.start())
+        # Rerun to display the first question and play audio
+        st.rerun()
 
-            # Generate audio for the first question
-            first_question_audio_path = "assistant_initial_intro.mp3"
-            try:
-                text_to_audio(client, initial_ai_prompt_content, first_question_audio_path, voice_type="alloy")
-                st.session_state.current_ai_response_text = initial_ai_prompt_content
-                st.session_state.current_ai_audio_path = first_question_audio_path
-                st.session_state.awaiting_user_action = True # Wait for user to click "Next Question"
-            except Exception as e:
-                st.error(f"Error generating initial interviewer audio: {e}. Falling back to text-only.")
-                st.session_state.current_ai_response_text = initial_ai_prompt_content
-                st.session_state.current_ai_audio_path = "" # No audio path if error
-                st.session_state.awaiting_user_action = True
-            
-            # Rerun to display the first question and play audio
-            st.rerun()
+    show_interview_errors(interview)
 
+    # Prepare the next reply in the background while the candidate listens or answers
+    interview.prefetch()
 
     # --- Display Past Messages (Text Only for History) ---
-    st.subheader("Conversation History")
-    for message in st.session_state.messages:
-        if message["role"] == "user":
-            st.markdown(f"**You:** {message['content']}")
-        elif message["role"] == "assistant" and "content" in message:
-            st.markdown(f"**Interviewer:** {message['content']}")
-    st.markdown("---")
+    history_area = st.empty()
+    with history_area.container():
+        render_history(interview)
 
     # --- Interview Turn Logic ---
+    turn_area = st.empty()
+    # Players of the reply's audio segments; never emptied in the run that fills it
+    audio_area = st.container()
 
     # Case 1: Assistant has just responded, waiting for user to click "Next Question"
-    if st.session_state.awaiting_user_action:
-        st.info("Please listen to the interviewer's response and click 'Next Question' when you're ready.")
-
-        if st.session_state.current_ai_audio_path and os.path.exists(st.session_state.current_ai_audio_path):
-            auto_play_audio(st.session_state.current_ai_audio_path)
-        st.write(f"**Interviewer:** {st.session_state.current_ai_response_text}")
-
-        # The first "Next Question" click should not increment user_message_count
-        # because the first question was from the AI directly.
-        if st.button("Next Question", key="continue_interview_button"):
-            st.session_state.awaiting_user_action = False
-            # Only increment user_message_count if we're past the initial AI intro AND it's a real user turn
-            # or if current_ai_audio_path is not the initial intro path.
-            # This logic needs careful handling to ensure user_message_count tracks actual user responses.
-            if st.session_state.current_ai_audio_path != "assistant_initial_intro.mp3":
-                st.session_state.user_message_count += 1
-            st.rerun()
+    if interview.awaiting_user_action:
+        with turn_area.container():
+            render_awaiting_view(interview)
+
+    # The reply to the last answer failed before any text arrived; the answer is kept, so only the reply is retried
+    elif interview.reply_missing:
+        with turn_area.container():
+            st.warning("The interviewer could not reply to your last answer.")
+            retry_clicked = st.button("Retry", key=f"retry_reply_button_{interview.user_message_count}")
+        if retry_clicked:
+            turn_area.empty()
+            with turn_area.container():
+                response_placeholder = st.empty()
+                with st.spinner("Interviewer is thinking..."):
+                    run_async(interview.retry_reply(
+                        on_text=lambda response_text: response_placeholder.markdown(f"**Interviewer:** {response_text}"),
+                        on_audio_segment=lambda audio_bytes: enqueue_audio_segment(audio_bytes, audio_area),
+                    ))
+            if not interview.awaiting_user_action:
+                st.rerun() # The reply failed again; show the error and the Retry button
+            render_reply(interview, history_area, turn_area)
 
     # Case 2: Ready for user input (either initial turn or after clicking "Next Question")
-    elif st.session_state.user_message_count < 5: # Limit to 5 user turns
-        st.subheader(f"Your Turn (Question {st.session_state.user_message_count + 1} of 5)")
-        mic_recorder_chat_output = mic_recorder(
-            start_prompt="🎙️ Speak your answer",
-            stop_prompt="⏹️ Stop Recording",
-            just_once=True,
-            use_container_width=True,
-            key=f"mic_recorder_chat_turn_{st.session_state.user_message_count}"
-        )
+    elif interview.user_message_count < MAX_QUESTIONS:
+        with turn_area.container():
+            st.subheader(f"Your Turn (Question {interview.user_message_count + 1} of {MAX_QUESTIONS})")
+            mic_recorder_chat_output = mic_recorder(
+                start_prompt="🎙️ Speak your answer",
+                stop_prompt="⏹️ Stop Recording",
+                just_once=True,
+                use_container_width=True,
+                key=f"mic_recorder_chat_turn_{interview.user_message_count}"
+            )
 
-        if mic_recorder_chat_output and mic_recorder_chat_output['bytes']:
-            audio_bytes = mic_recorder_chat_output['bytes']
-            temp_audio_file_path = "chat_audio_response.webm"
-            with open(temp_audio_file_path, "wb") as f:
-                f.write(audio_bytes)
-
-            with st.spinner("Transcribing your answer..."):
-                audio_file = open(temp_audio_file_path, "rb")
-                transcribed_text = client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file
-                ).text
-                audio_file.close()
-                os.remove(temp_audio_file_path)
-
-            st.session_state.current_chat_voice_input = transcribed_text
-            st.rerun()
+            if mic_recorder_chat_output and mic_recorder_chat_output['bytes']:
+                start_transcription("chat", mic_recorder_chat_output['bytes'])
 
-        user_prompt_input = st.text_area(
-            "Your answer:",
-            value=st.session_state.current_chat_voice_input,
-            placeholder="Type your response here or speak it...",
-            max_chars=1000,
-            key=f"chat_text_area_{st.session_state.user_message_count}"
-        )
+            if "chat" in st.session_state.pending_transcriptions:
+                st.caption("Transcribing your answer...")
 
-        if st.button("Send Answer", key=f"send_answer_button_{st.session_state.user_message_count}"):
-            if user_prompt_input:
-                st.session_state.messages.append({"role": "user", "content": user_prompt_input})
-                st.markdown(f"**You:** {user_prompt_input}")
+            # A transcribed answer is written into this widget by fill_transcribed_inputs()
+            user_prompt_input = st.text_area(
+                "Your answer:",
+                placeholder="Type your response here or speak it...",
+                max_chars=1000,
+                key=f"chat_text_area_{interview.user_message_count}"
+            )
 
-                st.session_state.current_chat_voice_input = ""
-
-                if st.session_state.user_message_count < 4: # If there are more questions to ask (total 5 user turns)
-                    with st.spinner("Interviewer is thinking..."):
-                        stream = client.chat.completions.create(
-                            model=st.session_state["openai_model"],
-                            messages=[
-                                {"role": m["role"], "content": m["content"]}
-                                for m in st.session_state.messages
-                            ],
-                            stream=True,
-                        )
-                        response_text = ""
-                        response_placeholder = st.empty()
-                        for chunk in stream:
-                            if chunk.choices[0].delta.content is not None:
-                                response_text += chunk.choices[0].delta.content
-                                response_placeholder.markdown(f"**Interviewer:** {response_text}")
-
-                        speech_file_path = f"assistant_response_{st.session_state.user_message_count}.mp3"
-                        try:
-                            text_to_audio(client, response_text, speech_file_path, voice_type="alloy")
-                            
-                            st.session_state.messages.append({"role": "assistant", "content": response_text, "audio_file_path": speech_file_path})
-                            st.session_state.current_ai_response_text = response_text
-                            st.session_state.current_ai_audio_path = speech_file_path
-                            
-                            st.session_state.awaiting_user_action = True
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Error generating or playing speech: {e}. Falling back to text-only.")
-                            st.session_state.messages.append({"role": "assistant", "content": response_text})
-                            st.session_state.awaiting_user_action = False
-                            st.session_state.user_message_count += 1
-                            st.rerun()
-
-                else: # If it was the last question (5th user turn)
-                    st.session_state.chat_complete = True
-                    st.session_state.awaiting_user_action = False # Ensure no awaiting action for completed chat
-                    st.rerun()
-            else:
+            send_answer_clicked = st.button("Send Answer", key=f"send_answer_button_{interview.user_message_count}")
+            if send_answer_clicked and not user_prompt_input:
                 st.warning("Please provide an answer before sending.")
 
-        # Option to finish interview at any point
-        if st.button("Finish Interview and Get Feedback", key="finish_interview_button"):
-            st.session_state.chat_complete = True
-            st.session_state.awaiting_user_action = False
-            st.rerun()
+            # Option to finish interview at any point
+            st.button("Finish Interview and Get Feedback", on_click=finish_interview, key="finish_interview_button")
+
+        if send_answer_clicked and user_prompt_input:
+            # Start the completion (and pipelined TTS) right away, in place of the input form
+            turn_area.empty()
+            with turn_area.container():
+                st.markdown(f"**You:** {user_prompt_input}")
+                response_placeholder = st.empty()
+                with st.spinner("Interviewer is thinking..."):
+                    run_async(interview.answer(
+                        user_prompt_input,
+                        on_text=lambda response_text: response_placeholder.markdown(f"**Interviewer:** {response_text}"),
+                        on_audio_segment=lambda audio_bytes: enqueue_audio_segment(audio_bytes, audio_area),
+                    ))
+
+            if not interview.awaiting_user_action:
+                # Interview complete, the reply failed, or the text-only fallback moved on to the next question
+                st.rerun()
+            render_reply(interview, history_area, turn_area)
 
     # Case 3: Interview is complete
     else:
-        st.session_state.chat_complete = True
+        interview.finish()
+
+    # Per-turn prompt size and latency, compared with sending the full history
+    if interview.chat_context.usage:
+        with st.sidebar.expander("Token usage per turn"):
+            for report in interview.chat_context.usage:
+                st.caption(
+                    f"Turn {report['turn']}: {report.get('prompt_tokens', report['prompt_tokens_estimated'])} prompt tokens "
+                    f"(full history ~{report['full_history_tokens']}, {report['summarized_messages']} messages summarized)"
+                )
+    if interview.turn_timings:
+        with st.sidebar.expander("Reply latency per turn"):
+            for timing in interview.turn_timings:
+                first_audio = f"{timing['time_to_first_audio']:.2f}s" if timing["time_to_first_audio"] is not None else "n/a"
+                first_token = f"{timing['time_to_first_token']:.2f}s" if timing["time_to_first_token"] is not None else "n/a"
+                model = f" ({timing['model']})" if timing.get("model") else ""
+                st.caption(f"Turn {timing['turn']}{model}: first audio after {first_audio} (first token after {first_token})")
+    if interview.job_post is not None:
+        with st.sidebar.expander("Job requirements"):
+            st.caption(interview.job_post.summary)
+            if interview.skill_match and interview.skill_match["gaps"]:
+                st.caption(f"Not shown in your profile: {', '.join(interview.skill_match['gaps'])}")
+    memory_usage = interview.memory_usage()
+    with st.sidebar.expander("Session memory"):
+        st.caption(
+            f"{memory_usage['total_bytes'] / 1024:.1f} KiB in total: audio {memory_usage['audio_bytes'] / 1024:.1f} KiB, "
+            f"conversation {memory_usage['conversation_bytes'] / 1024:.1f} KiB, context {memory_usage['context_bytes'] / 1024:.1f} KiB"
+        )
 
 
 # --- Feedback and Restart ---
-if st.session_state.chat_complete and not st.session_state.feedback_shown:
+if interview and interview.chat_complete and not st.session_state.feedback_shown:
     if st.button("Get Feedback", on_click=show_feedback, key="get_feedback_button"):
         st.write("Fetching feedback...")
 
-if st.session_state.feedback_shown:
+if st.session_state.feedback_shown and interview:
     st.subheader("Feedback")
 
-    feedback_messages_for_llm = [
-        {"role": msg["role"], "content": msg["content"]}
-        for msg in st.session_state.messages if msg["role"] != "system"
-    ]
-    conversation_history = "\n".join([f"{msg['role']}: {msg['content']}" for msg in feedback_messages_for_llm])
-
-    feedback_client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
-
-    feedback_completion = feedback_client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": """You are a helpful tool that provides feedback on an interviewee performance.
-            Before the Feedback give a score of 1 to 10.
-            Follow this format:
-            Overall Score: //Your score
-            Feedback: //Here you put your feedback
-            Give only the feedback do not ask any additional questions.
-            """},
-            {"role": "user", "content": f"This is the interview you need to evaluate. Keep in mind that you are only a tool. And you shouldn't engage in any conversation: {conversation_history}"}
-        ]
-    )
+    # Generated only once per finished interview; reruns reuse the engine's cached result
+    with st.spinner("Generating feedback..."):
+        feedback = run_async(interview.feedback())
+    show_interview_errors(interview)
+
+    st.write(feedback["text"])
+
+    # Autoplay audio of the feedback
+    if feedback["audio_bytes"]:
+        auto_play_audio_bytes(feedback["audio_bytes"])
 
-    feedback_text = feedback_completion.choices[0].message.content
-    st.write(feedback_text)
-    
-    # Generate and autoplay audio of the feedback
-    feedback_audio_file = "feedback_summary.mp3"
-    try:
-        text_to_audio(feedback_client, feedback_text, feedback_audio_file, voice_type="alloy")
-        st.session_state.feedback_audio_path = feedback_audio_file
-        auto_play_audio(feedback_audio_file)
-    except Exception as e:
-        st.error(f"Error generating feedback audio: {e}. Displaying text only.")
-    
     col1, col2 = st.columns(2)
     with col1:
         if st.button("Restart Interview (Full Reset)", type="primary", key="restart_interview_full"):
@@ -519,5 +600,65 @@ if st.session_state.feedback_shown:
             restart_with_same_inputs()
 
 
+# --- Last recording ---
+recording_report = st.session_state.last_recording_report
+if recording_report and recording_report["input_seconds"] is not None:
+    with st.sidebar.expander("Last recording upload"):
+        st.caption(
+            f"{recording_report['input_seconds']:.1f}s → {recording_report['output_seconds']:.1f}s of audio, "
+            f"{recording_report['input_bytes'] / 1024:.1f} KiB → {recording_report['output_bytes'] / 1024:.1f} KiB uploaded"
+        )
+
+
+# --- Interview ID ---
+if interview is not None:
+    st.sidebar.caption(f"Interview ID: `{interview.interview_id}`. Reopen this page or enter the ID on the setup page to resume it.")
+
+
+# --- Metrics panel ---
+# Process-wide stage latencies for operators; enable with SHOW_METRICS_PANEL = true in secrets
+if st.secrets.get("SHOW_METRICS_PANEL", False):
+    stage_summary = metrics.summary()
+    if stage_summary:
+        with st.sidebar.expander("Stage latency (all sessions)"):
+            st.dataframe(
+                [
+                    {
+                        "stage": stage,
+                        "count": stats["count"],
+                        "errors": stats["errors"],
+                        **{key: stats[key] for key in ("p50", "p95", "p99")},
+                    }
+                    for stage, stats in sorted(stage_summary.items())
+                ],
+                hide_index=True,
+            )
+            session_stats = get_session_registry().stats()
+            st.caption(
+                f"{session_stats['sessions']} live interviews, {session_stats['bytes_per_session'] / 1024:.1f} KiB each on average, "
+                f"{session_stats['shared_job_posts']} shared job posts"
+            )
+            model_stats = get_model_router().stats()
+            if model_stats:
+                st.markdown("**Model usage**")
+                st.dataframe(
+                    [
+                        {
+                            "model": model,
+                            "calls": stats.get("calls", 0),
+                            "errors": stats.get("errors", 0),
+                            "tokens": stats.get("prompt_tokens", 0) + stats.get("completion_tokens", 0),
+                            "cost_usd": round(stats.get("cost_usd", 0.0), 4),
+                            "follow_up_p95": stats.get("follow_up_p95"),
+                        }
+                        for model, stats in sorted(model_stats.items())
+                    ],
+                    hide_index=True,
+                )
+            st.download_button("Prometheus metrics", metrics.to_prometheus(), file_name="metrics.prom", mime="text/plain")
+            st.download_button("JSON lines", metrics.to_json_lines(), file_name="metrics.jsonl", mime="application/json")
 
 
+# --- Pending transcriptions ---
+# Resolved last, so the rest of the page is already rendered while Whisper is working
+finish_pending_transcriptions()
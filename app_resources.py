@@ -0,0 +1,173 @@
+# Settings, process-wide resources and session state defaults of the Streamlit app.
+# Streamlit executes app.py again on every rerun, while this module is imported once
+# per server process, so a rerun only runs the page code. Dependencies that are slow
+# to import (the OpenAI SDK, numpy) are loaded on first use or by warm_up().
+import importlib
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from interview_engine import InterviewSession
+from interview_store import InterviewStore
+from job_post_cache import JobPostCache
+from model_router import ModelRouter
+from openai_client import get_openai_client
+from session_memory import SessionRegistry
+from transcription import TranscriptionService
+from tts_cache import TTSCache
+
+# Audio store settings: memory budget per session and whether evicted clips spill to a temp directory
+AUDIO_STORE_BYTE_BUDGET = 8 * 1024 * 1024
+AUDIO_STORE_SPILL_TO_DISK = False
+# Pipelined TTS: speak each sentence of the interviewer reply while the rest is still being generated
+PIPELINED_TTS = True
+TTS_PIPELINE_WORKERS = 3
+# Whisper requests in flight at once across all sessions
+TRANSCRIPTION_WORKERS = 4
+# Prompt token budget per interviewer turn; older turns beyond it are folded into a rolling summary
+CONTEXT_TOKEN_BUDGET = 1500
+CONTEXT_KEEP_RECENT_MESSAGES = 4
+# Models per LLM stage, tried in order. Interviewer replies go to the fast tier first and fall
+# back to gpt-4o on errors or while the fast tier's p95 latency is over the budget (seconds);
+# scoring and the final feedback prefer gpt-4o. Summaries and job post extraction stay on the
+# small model. Every attempt but the last gives up after its timeout.
+MODEL_ROUTES = {
+    "follow_up": {"models": ["gpt-4o-mini", "gpt-4o"], "latency_budget": 1.5, "timeout": 10},
+    "evaluation": {"models": ["gpt-4o", "gpt-4o-mini"], "timeout": 20},
+    "feedback": {"models": ["gpt-4o", "gpt-4o-mini"], "timeout": 30},
+    "summary": {"models": ["gpt-4o-mini", "gpt-4o"], "timeout": 15},
+    "job_post": {"models": ["gpt-4o-mini", "gpt-4o"], "timeout": 15},
+}
+# Background per-answer scoring calls in flight at once across all sessions
+EVALUATION_WORKERS = 8
+# Interviews idle for this long (e.g. a closed tab) release their audio and conversation
+SESSION_TTL_SECONDS = 30 * 60
+# SQLite file of the saved interviews; the interview ID in the page URL resumes one after a refresh.
+# Set INTERVIEW_DB_PATH in secrets to use another file, e.g. for benchmarks
+INTERVIEW_DB_PATH = "interviews.db"
+# Loaded in the background while the setup page is shown, before the first API call needs them
+WARM_UP_MODULES = ("openai", "audio_preprocessing")
+
+# Session state defaults, set in one pass at the start of each run. Callables are
+# factories, so every session gets its own mutable value.
+SESSION_DEFAULTS = {
+    # Identifies this browser session as the owner of its interview in the session registry
+    "session_id": lambda: uuid.uuid4().hex,
+    "setup_complete": False,
+    "feedback_shown": False,
+    # The running interview (an InterviewSession); it holds the messages, turn state and audio
+    "interview": None,
+    # The CandidateProfile saved at setup, for "Restart with Same Inputs"
+    "initial_inputs": None,
+    "openai_model": "gpt-4o",
+    # Personal information, company and position entered at setup
+    "name": "",
+    "experience": "",
+    "skills": "",
+    "company": "",
+    "position": "",
+    "job_post": "",
+    # Initial personal information audio transcriptions
+    "name_audio_transcription": "",
+    "experience_audio_transcription": "",
+    "skills_audio_transcription": "",
+    # Transcribed text waiting to be written into its input widget, by widget key
+    "transcribed_inputs": dict,
+    # Transcriptions still in flight, keyed by the input they will fill ("name", "experience", "skills" or "chat")
+    "pending_transcriptions": dict,
+    # Bytes and durations of the last recording before and after preprocessing
+    "last_recording_report": None,
+}
+
+
+def init_session_state():
+    """Sets the defaults of all session state variables that are not set yet."""
+    session_state = st.session_state
+    for key, default in SESSION_DEFAULTS.items():
+        if key not in session_state:
+            session_state[key] = default() if callable(default) else default
+
+
+@st.cache_resource
+def warm_up():
+    """Starts importing the slow dependencies in a background thread, once per server process."""
+    thread = threading.Thread(
+        target=lambda: [importlib.import_module(module) for module in WARM_UP_MODULES],
+        name="warm-up",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+# --- Shared OpenAI client ---
+def get_client():
+    """Returns the process-wide OpenAI client. Set OPENAI_BASE_URL in secrets to use a local stand-in server."""
+    return get_openai_client(st.secrets["OPENAI_API_KEY"], base_url=st.secrets.get("OPENAI_BASE_URL"))
+
+
+@st.cache_resource
+def get_tts_cache():
+    """Process-wide TTS cache shared by all sessions, so deterministic prompts are synthesized once."""
+    return TTSCache()
+
+
+@st.cache_resource
+def get_transcription_service():
+    """Process-wide transcription worker pool and transcript cache."""
+    return TranscriptionService(max_workers=TRANSCRIPTION_WORKERS)
+
+
+@st.cache_resource
+def get_evaluation_executor():
+    """Worker pool shared by all sessions for background answer scoring."""
+    return ThreadPoolExecutor(max_workers=EVALUATION_WORKERS, thread_name_prefix="evaluation")
+
+
+@st.cache_resource
+def get_session_registry():
+    """Process-wide registry of live interviews, used to evict idle ones."""
+    return SessionRegistry(ttl=SESSION_TTL_SECONDS)
+
+
+@st.cache_resource
+def get_model_router():
+    """Process-wide model router, so the latency and failures of each model are shared by all sessions."""
+    return ModelRouter(MODEL_ROUTES)
+
+
+@st.cache_resource
+def get_interview_store():
+    """Process-wide SQLite store of the interviews of all sessions."""
+    return InterviewStore(st.secrets.get("INTERVIEW_DB_PATH", INTERVIEW_DB_PATH))
+
+
+@st.cache_resource
+def get_job_post_cache():
+    """Process-wide cache of preprocessed job posts, shared by all candidates for the same posting."""
+    return JobPostCache()
+
+
+def create_interview():
+    """Creates the interview for the inputs saved at setup, sharing the process-wide pools and caches."""
+    interview = InterviewSession(
+        get_client(),
+        st.session_state.initial_inputs,
+        model=st.session_state["openai_model"],
+        pipelined_tts=PIPELINED_TTS,
+        tts_workers=TTS_PIPELINE_WORKERS,
+        context_token_budget=CONTEXT_TOKEN_BUDGET,
+        context_keep_recent=CONTEXT_KEEP_RECENT_MESSAGES,
+        audio_byte_budget=AUDIO_STORE_BYTE_BUDGET,
+        audio_spill_to_disk=AUDIO_STORE_SPILL_TO_DISK,
+        tts_cache=get_tts_cache(),
+        transcription_service=get_transcription_service(),
+        evaluation_executor=get_evaluation_executor(),
+        job_post_cache=get_job_post_cache(),
+        router=get_model_router(),
+        store=get_interview_store(),
+    )
+    get_session_registry().register(interview, owner=st.session_state.session_id)
+    return interview
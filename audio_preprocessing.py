@@ -0,0 +1,150 @@
+import shutil
+import subprocess
+import time
+
+import numpy as np
+
+from metrics import metrics
+
+# Whisper works at 16 kHz mono internally, so more is only extra upload
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+# Frames this much louder than the noise floor count as speech
+SPEECH_MARGIN_DB = 12
+# Frames quieter than this are never speech, however quiet the room is
+MIN_SPEECH_DBFS = -50
+# Frames louder than this are always speech, however noisy the room is
+LOUD_SPEECH_DBFS = -35
+# Audio kept before and after each stretch of speech
+PADDING_MS = 200
+# Pauses inside the answer are shortened to this length
+MAX_PAUSE_MS = 600
+OPUS_BITRATE = "24k"
+ENCODED_FILE_EXTENSION = "ogg"
+
+
+def ffmpeg_available():
+    return shutil.which("ffmpeg") is not None
+
+
+def _run_ffmpeg(arguments, input_bytes):
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", *arguments],
+        input=input_bytes,
+        capture_output=True,
+        check=True,
+    )
+    return result.stdout
+
+
+def decode_to_pcm(audio_bytes):
+    """Decodes any recorded format to 16 kHz mono 16-bit samples."""
+    pcm = _run_ffmpeg(["-i", "pipe:0", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1"], audio_bytes)
+    return np.frombuffer(pcm, dtype=np.int16)
+
+
+def encode_opus(samples):
+    """Encodes 16 kHz mono samples as a compact Ogg/Opus clip tuned for speech."""
+    return _run_ffmpeg(
+        ["-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", "1", "-i", "pipe:0",
+         "-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip", "-f", "ogg", "pipe:1"],
+        samples.tobytes(),
+    )
+
+
+def speech_frames(samples, frame_samples):
+    """Energy-based voice activity detection: returns one boolean per frame."""
+    frame_count = len(samples) // frame_samples
+    if frame_count == 0:
+        return np.zeros(0, dtype=bool)
+    frames = samples[:frame_count * frame_samples].astype(np.float32).reshape(frame_count, frame_samples) / 32768.0
+    levels_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    noise_floor_db = np.percentile(levels_db, 10)
+    threshold_db = min(max(noise_floor_db + SPEECH_MARGIN_DB, MIN_SPEECH_DBFS), LOUD_SPEECH_DBFS)
+    return levels_db > threshold_db
+
+
+def trim_silence(samples):
+    """Drops leading and trailing silence and shortens long pauses; returns None if there is no speech."""
+    frame_samples = SAMPLE_RATE * FRAME_MS // 1000
+    is_speech = speech_frames(samples, frame_samples)
+    if not is_speech.any():
+        return None
+
+    # Keep some audio around each stretch of speech, so word onsets are not clipped
+    padding = PADDING_MS // FRAME_MS
+    keep = is_speech.copy()
+    for offset in range(1, padding + 1):
+        keep[offset:] |= is_speech[:-offset]
+        keep[:-offset] |= is_speech[offset:]
+
+    max_pause = MAX_PAUSE_MS // FRAME_MS
+    speech_indices = np.flatnonzero(keep)
+    kept_frames = []
+    pause = 0
+    for index in range(speech_indices[0], speech_indices[-1] + 1):
+        if keep[index]:
+            pause = 0
+        else:
+            pause += 1
+            if pause > max_pause:
+                continue
+        kept_frames.append(index)
+    frames = samples[:len(is_speech) * frame_samples].reshape(len(is_speech), frame_samples)
+    return frames[kept_frames].reshape(-1)
+
+
+def split_samples(samples, chunk_seconds, overlap_seconds):
+    """Splits samples into chunks of chunk_seconds that overlap by overlap_seconds."""
+    chunk_size = int(chunk_seconds * SAMPLE_RATE)
+    step = chunk_size - int(overlap_seconds * SAMPLE_RATE)
+    if len(samples) <= chunk_size:
+        return [samples]
+    return [samples[start:start + chunk_size] for start in range(0, len(samples) - int(overlap_seconds * SAMPLE_RATE), step)]
+
+
+def prepare_samples(audio_bytes):
+    """Decodes a recording to 16 kHz mono and trims its silence.
+
+    Returns (samples, report); the report holds the byte counts and durations before
+    and after. samples is None without ffmpeg, or if the recording can't be decoded or
+    contains no speech, in which case the original bytes should be uploaded.
+    """
+    report = {"input_bytes": len(audio_bytes), "output_bytes": len(audio_bytes), "input_seconds": None, "output_seconds": None, "chunks": 1}
+    if not ffmpeg_available():
+        return None, report
+    try:
+        samples = decode_to_pcm(audio_bytes)
+    except (OSError, subprocess.CalledProcessError):
+        return None, report
+    report["input_seconds"] = report["output_seconds"] = len(samples) / SAMPLE_RATE
+    trimmed = trim_silence(samples)
+    if trimmed is not None:
+        report["output_seconds"] = len(trimmed) / SAMPLE_RATE
+    return trimmed, report
+
+
+def preprocess_audio(audio_bytes):
+    """Trims silence, downmixes to 16 kHz mono and re-encodes a recording before upload.
+
+    Returns (audio_bytes, file_extension, report). If the recording can't be
+    preprocessed, the original bytes are returned with file_extension None.
+    """
+    started_at = time.perf_counter()
+    samples, report = prepare_samples(audio_bytes)
+    if samples is None:
+        return audio_bytes, None, report
+    try:
+        encoded = encode_opus(samples)
+    except (OSError, subprocess.CalledProcessError):
+        return audio_bytes, None, report
+    report["output_bytes"] = len(encoded)
+    metrics.observe(
+        "audio_preprocessing",
+        time.perf_counter() - started_at,
+        input_bytes=report["input_bytes"],
+        output_bytes=report["output_bytes"],
+        input_audio_seconds=report["input_seconds"],
+        output_audio_seconds=report["output_seconds"],
+    )
+    return encoded, ENCODED_FILE_EXTENSION, report
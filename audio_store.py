@@ -0,0 +1,120 @@
+import itertools
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+
+# Default memory budget for the audio held by one session
+DEFAULT_BYTE_BUDGET = 8 * 1024 * 1024
+
+
+def _remove_dir(path):
+    shutil.rmtree(path, ignore_errors=True)
+
+
+class AudioStore:
+    """Session-scoped store that keeps audio clips in memory by key.
+
+    Clips are evicted least recently used first once the byte budget is exceeded.
+    With spill_to_disk enabled, evicted clips are written to a per-session temp
+    directory instead of being dropped, and are loaded back on the next access.
+    """
+
+    def __init__(self, byte_budget=DEFAULT_BYTE_BUDGET, spill_to_disk=False):
+        self.byte_budget = byte_budget
+        self.spill_to_disk = spill_to_disk
+        self._clips = OrderedDict()
+        self._spilled = {}
+        self._total_bytes = 0
+        self._spill_dir = None
+        self._finalizer = None
+        self._spill_counter = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def total_bytes(self):
+        """Number of audio bytes currently held in memory."""
+        return self._total_bytes
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._clips or key in self._spilled
+
+    def __len__(self):
+        with self._lock:
+            return len(self._clips) + len(self._spilled)
+
+    def put(self, key, data):
+        """Stores the audio bytes under key, replacing any previous clip."""
+        with self._lock:
+            self._discard(key)
+            self._clips[key] = data
+            self._total_bytes += len(data)
+            self._evict(keep=key)
+
+    def get(self, key):
+        """Returns the audio bytes for key, or None if the clip is not stored."""
+        with self._lock:
+            if key in self._clips:
+                self._clips.move_to_end(key)
+                return self._clips[key]
+            spilled_path = self._spilled.pop(key, None)
+            if spilled_path is None:
+                return None
+            with open(spilled_path, "rb") as spilled_file:
+                data = spilled_file.read()
+            os.remove(spilled_path)
+            self._clips[key] = data
+            self._total_bytes += len(data)
+            self._evict(keep=key)
+            return data
+
+    def discard(self, key):
+        """Removes the clip stored under key, if any."""
+        with self._lock:
+            self._discard(key)
+
+    def clear(self):
+        """Removes every clip of this session, including spilled ones."""
+        with self._lock:
+            self._clips.clear()
+            self._spilled.clear()
+            self._total_bytes = 0
+            if self._finalizer is not None:
+                self._finalizer()
+                self._finalizer = None
+                self._spill_dir = None
+
+    def _discard(self, key):
+        data = self._clips.pop(key, None)
+        if data is not None:
+            self._total_bytes -= len(data)
+        spilled_path = self._spilled.pop(key, None)
+        if spilled_path is not None and os.path.exists(spilled_path):
+            os.remove(spilled_path)
+
+    def _evict(self, keep=None):
+        while self._total_bytes > self.byte_budget and self._clips:
+            key = next(iter(self._clips))
+            if key == keep:
+                # Never evict the clip being stored or returned; it may exceed the budget on its own
+                if len(self._clips) == 1:
+                    break
+                self._clips.move_to_end(key)
+                continue
+            data = self._clips.pop(key)
+            self._total_bytes -= len(data)
+            if self.spill_to_disk:
+                self._spill(key, data)
+
+    def _spill(self, key, data):
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="interview_audio_")
+            # Remove the spill directory when the session's store is garbage collected
+            self._finalizer = weakref.finalize(self, _remove_dir, self._spill_dir)
+        spilled_path = os.path.join(self._spill_dir, f"clip_{next(self._spill_counter)}.bin")
+        with open(spilled_path, "wb") as spilled_file:
+            spilled_file.write(data)
+        self._spilled[key] = spilled_path
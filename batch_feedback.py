@@ -0,0 +1,134 @@
+"""Batch feedback: exports or regenerates the feedback of stored interviews.
+
+Reads the interviews saved by app.py, optionally filtered by candidate, company
+or position. With --regenerate, the answers of each interview are scored again
+and the new feedback is appended to its log; at most --workers evaluation calls
+are in flight at once. Run from the repository root:
+
+    python batch_feedback.py --company Acme --regenerate missing --output feedback.jsonl
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from evaluation import evaluate_answer, merge_evaluations
+from interview_engine import parse_feedback_score
+from interview_store import DEFAULT_DB_PATH, FEEDBACK, InterviewStore
+
+EXPORT_FIELDS = ("id", "created_at", "candidate", "company", "position", "answers", "score", "feedback", "regenerated")
+
+
+def regenerate_feedback(store, client, interview_id, executor, model):
+    """Scores every answer of the interview on the executor and appends the merged feedback.
+
+    Returns the feedback event, or None if the interview has no answers or none could be scored.
+    """
+    stored = store.load(interview_id)
+    futures = [
+        executor.submit(evaluate_answer, client, question, answer, stored.profile.position, model)
+        for question, answer in stored.answers
+    ]
+    evaluations = []
+    for future in futures:
+        try:
+            evaluations.append(future.result())
+        except Exception as e:
+            print(f"{interview_id}: could not score an answer: {e}", file=sys.stderr)
+    if not evaluations:
+        return None
+    feedback_text = merge_evaluations(evaluations)
+    feedback = {
+        "score": parse_feedback_score(feedback_text),
+        "text": feedback_text,
+        "answer_evaluations": evaluations,
+        "regenerated": True,
+    }
+    store.append(interview_id, FEEDBACK, feedback)
+    return feedback
+
+
+def export_row(store, interview_id):
+    stored = store.load(interview_id)
+    feedback = stored.feedback or {}
+    return {
+        "id": stored.id,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(stored.created_at)),
+        "candidate": stored.profile.name,
+        "company": stored.profile.company,
+        "position": stored.profile.position,
+        "answers": len(stored.answers),
+        "score": feedback.get("score"),
+        "feedback": feedback.get("text"),
+        "regenerated": feedback.get("regenerated", False),
+    }
+
+
+def write_rows(rows, output, output_format):
+    if output_format == "csv":
+        writer = csv.DictWriter(output, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        for row in rows:
+            output.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite file written by the app")
+    parser.add_argument("--candidate", help="Only interviews of this candidate")
+    parser.add_argument("--company", help="Only interviews for this company")
+    parser.add_argument("--position", help="Only interviews for this position")
+    parser.add_argument("--include-unfinished", action="store_true", help="Also include interviews that were not finished")
+    parser.add_argument("--limit", type=int, help="At most this many interviews, newest first")
+    parser.add_argument("--regenerate", choices=("none", "missing", "all"), default="none",
+                        help="Score again the interviews without feedback (missing) or all of them")
+    parser.add_argument("--workers", type=int, default=8, help="Evaluation calls in flight at once")
+    parser.add_argument("--model", default="gpt-4o", help="Model that scores the answers")
+    parser.add_argument("--format", dest="output_format", choices=("jsonl", "csv"), default="jsonl")
+    parser.add_argument("--output", help="Write the export to this file instead of standard output")
+    args = parser.parse_args()
+
+    store = InterviewStore(args.db)
+    interviews = store.find(
+        candidate=args.candidate,
+        company=args.company,
+        position=args.position,
+        completed=None if args.include_unfinished else True,
+        limit=args.limit,
+    )
+    interview_ids = [interview["id"] for interview in interviews]
+
+    if args.regenerate != "none":
+        from openai_client import get_openai_client # Only needed when calling the API
+        client = get_openai_client(os.environ["OPENAI_API_KEY"], base_url=os.environ.get("OPENAI_BASE_URL"))
+        if args.regenerate == "missing":
+            interview_ids_to_score = [i for i in interview_ids if store.load(i).feedback is None]
+        else:
+            interview_ids_to_score = interview_ids
+        started_at = time.perf_counter()
+        # Interviews run one per thread, and all their answer evaluations share one bounded pool
+        with ThreadPoolExecutor(max_workers=args.workers) as evaluation_executor, \
+                ThreadPoolExecutor(max_workers=args.workers) as interview_executor:
+            results = list(interview_executor.map(
+                lambda interview_id: regenerate_feedback(store, client, interview_id, evaluation_executor, args.model),
+                interview_ids_to_score,
+            ))
+        print(f"Regenerated feedback for {sum(1 for r in results if r is not None)} of {len(interview_ids_to_score)} "
+              f"interviews in {time.perf_counter() - started_at:.1f}s", file=sys.stderr)
+
+    rows = [export_row(store, interview_id) for interview_id in interview_ids]
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as output:
+            write_rows(rows, output, args.output_format)
+    else:
+        write_rows(rows, sys.stdout, args.output_format)
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
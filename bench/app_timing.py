@@ -0,0 +1,140 @@
+"""App timing: measures the cold start and rerun time of the Streamlit script.
+
+Runs app.py headless with Streamlit's AppTest against the mock OpenAI API. The
+cold start is the first run of the script in a fresh process (Streamlit itself
+already imported, as in a running server); reruns are measured on the setup page
+and on the interview page once a few answers are in the history. Run from the
+repository root:
+
+    python -m bench.app_timing
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# The app's own modules are only imported by the script under test, so the cold start includes them
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+ANSWERS_IN_HISTORY = 4
+
+
+def share_script_cache():
+    """Makes AppTest reuse the compiled script across runs, like a Streamlit server; returns False if it can't.
+
+    A server compiles app.py once and reuses the bytecode on every rerun, while AppTest
+    compiles it again for each run. AppTest has no option for this, so the private
+    ScriptCache name its runner module imports is replaced. If a Streamlit upgrade
+    renames it, the reruns are timed with the compile included, and the report says so.
+    """
+    from streamlit.testing.v1 import local_script_runner
+
+    if not hasattr(local_script_runner, "ScriptCache"):
+        return False
+    script_cache = local_script_runner.ScriptCache()
+    local_script_runner.ScriptCache = lambda: script_cache
+    return True
+
+
+def new_app_test(base_url, db_path):
+    from streamlit.testing.v1 import AppTest
+
+    app_test = AppTest.from_file(APP_PATH, default_timeout=60)
+    app_test.secrets["OPENAI_API_KEY"] = "bench"
+    app_test.secrets["OPENAI_BASE_URL"] = base_url
+    # The bench interviews go to a scratch file, not the app's interviews.db
+    app_test.secrets["INTERVIEW_DB_PATH"] = db_path
+    return app_test
+
+
+def timed_run(app_test):
+    started_at = time.perf_counter()
+    app_test.run()
+    if app_test.exception:
+        raise RuntimeError(app_test.exception[0].message)
+    return time.perf_counter() - started_at
+
+
+def measure_cold_start(base_url, db_path):
+    """Times the first run of the script in a fresh process; that run imports everything the setup page needs."""
+    code = (
+        "import json, time\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        "from bench.app_timing import new_app_test, timed_run\n"
+        f"app_test = new_app_test({base_url!r}, {db_path!r})\n"
+        "print(json.dumps(timed_run(app_test)))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure_reruns(base_url, db_path, reruns):
+    """Times reruns of the setup page, then of the interview page with answers in the history."""
+    app_test = new_app_test(base_url, db_path)
+    timed_run(app_test)
+    # The first run starts loading the API client in the background, which in real use
+    # overlaps with the candidate filling in the form; let it finish before timing reruns
+    for thread in threading.enumerate():
+        if thread.name == "warm-up":
+            thread.join()
+    setup_reruns = [timed_run(app_test) for _ in range(reruns)]
+
+    app_test.text_input(key="name_text_input").input("Bench")
+    app_test.text_area(key="experience_text_input").input("Five years of backend work")
+    app_test.text_area(key="skills_text_input").input("Python, SQL")
+    app_test.text_input(key="company_text_input").input("Acme")
+    app_test.text_input(key="position_text_input").input("Backend Engineer")
+    app_test.button(key="start_interview_button").click()
+    timed_run(app_test)
+    for turn in range(ANSWERS_IN_HISTORY):
+        app_test.button(key="continue_interview_button").click()
+        timed_run(app_test)
+        app_test.text_area(key=f"chat_text_area_{turn}").input(f"Answer number {turn + 1}")
+        app_test.button(key=f"send_answer_button_{turn}").click()
+        timed_run(app_test)
+    interview_reruns = [timed_run(app_test) for _ in range(reruns)]
+    return setup_reruns, interview_reruns
+
+
+def main():
+    from bench.load_test import start_mock_server
+    from bench.mock_openai_server import add_arguments
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cold-starts", type=int, default=3, help="Fresh processes to time the first run in")
+    parser.add_argument("--reruns", type=int, default=20, help="Reruns to time on each page")
+    parser.add_argument("--json", metavar="PATH", help="Also write the report as JSON")
+    args = add_arguments(parser).parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="interview_bench_db_"), "interviews.db")
+    script_cache_shared = share_script_cache()
+    server_process, base_url = start_mock_server(args)
+    try:
+        cold_starts = [measure_cold_start(base_url, db_path) for _ in range(args.cold_starts)]
+        setup_reruns, interview_reruns = measure_reruns(base_url, db_path, args.reruns)
+    finally:
+        server_process.terminate()
+        server_process.wait()
+
+    report = {
+        "cold_start_ms": statistics.median(cold_starts) * 1000,
+        "setup_rerun_ms": statistics.median(setup_reruns) * 1000,
+        "interview_rerun_ms": statistics.median(interview_reruns) * 1000,
+        "script_cache_shared": script_cache_shared,
+    }
+    if not script_cache_shared:
+        print("Note: this Streamlit version's AppTest could not share the compiled script, so reruns include compiling app.py")
+    print(f"Cold start (first run of the setup page): {report['cold_start_ms']:.1f} ms")
+    print(f"Rerun of the setup page: {report['setup_rerun_ms']:.1f} ms")
+    print(f"Rerun of the interview page ({ANSWERS_IN_HISTORY} answers in the history): {report['interview_rerun_ms']:.1f} ms")
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
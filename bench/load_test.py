@@ -0,0 +1,249 @@
+"""Load test: runs N concurrent five-question interviews against the mock OpenAI API.
+
+Each simulated candidate goes through setup (a transcribed voice input), the
+interview (a transcribed answer per question) and feedback, using the same
+engine and process-wide pools as app.py. Reports throughput, per-stage latency,
+API calls per interview and memory per session. Run from the repository root:
+
+    python -m bench.load_test --sessions 20
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# The pool sizes and model routes of the app, so the test runs with the same settings
+from app_resources import EVALUATION_WORKERS, MODEL_ROUTES, TRANSCRIPTION_WORKERS
+from bench.mock_openai_server import add_arguments
+from interview_engine import MAX_QUESTIONS, InterviewSession
+from interview_store import InterviewStore
+from job_post_cache import JobPostCache
+from metrics import metrics, percentile
+from model_router import ModelRouter
+from openai_client import get_openai_client
+from transcription import TranscriptionService
+from tts_cache import TTSCache
+
+# Size of each simulated recording
+VOICE_CLIP_BYTES = 48 * 1024
+
+# Every candidate applies to the same posting, so it is preprocessed once
+JOB_POST = (
+    "We are looking for a senior backend engineer to build and operate our Python services. "
+    "You will design APIs, own PostgreSQL schemas, run workloads on Kubernetes and mentor other engineers. "
+) * 4
+
+
+def start_mock_server(args):
+    """Starts the mock API in a subprocess, so its work does not compete with the sessions for the GIL."""
+    command = [sys.executable, "-m", "bench.mock_openai_server", "--port", "0"]
+    for action in add_arguments(argparse.ArgumentParser())._actions:
+        if action.dest != "help":
+            command += [action.option_strings[0], str(getattr(args, action.dest))]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    base_url = process.stdout.readline().strip().rsplit(" ", 1)[-1]
+    return process, base_url
+
+
+def fetch_server_stats(base_url):
+    try:
+        with urllib.request.urlopen(f"{base_url}/stats", timeout=5) as response:
+            return json.load(response)
+    except Exception: # A real OpenAI-compatible server has no stats endpoint
+        return {}
+
+
+def run_interview(number, client, shared):
+    """Runs one candidate through setup, five answers and feedback, like a Streamlit session would."""
+    started_at = time.perf_counter()
+    # Setup: one of the fields is spoken instead of typed
+    experience = shared["transcription_service"].transcribe(client, os.urandom(VOICE_CLIP_BYTES), file_name="experience.webm")
+    session = InterviewSession(
+        client,
+        {
+            "name": f"Candidate {number}",
+            "experience": experience,
+            "skills": "Python, SQL, cloud infrastructure",
+            "company": "Acme",
+            "position": "Backend Engineer",
+            "job_post": JOB_POST,
+        },
+        tts_cache=shared["tts_cache"],
+        transcription_service=shared["transcription_service"],
+        evaluation_executor=shared["evaluation_executor"],
+        job_post_cache=shared["job_post_cache"],
+        router=shared["router"],
+        store=shared["store"],
+    )
+
+    asyncio.run(session.start())
+    audio_segments = 0
+    while not session.chat_complete:
+        if session.awaiting_user_action:
+            asyncio.run(session.next_question())
+        session.prefetch()
+        answer = asyncio.run(session.transcribe(os.urandom(VOICE_CLIP_BYTES)))
+
+        def count_segment(audio_segment):
+            nonlocal audio_segments
+            audio_segments += 1
+        asyncio.run(session.answer(answer, on_audio_segment=count_segment))
+
+    feedback = asyncio.run(session.feedback())
+    # Streamlit reruns the feedback page; it must not be generated again
+    repeated_feedback = asyncio.run(session.feedback())
+    stored = shared["store"].load(session.interview_id)
+    return {
+        "session": session,
+        "seconds": time.perf_counter() - started_at,
+        "resumable": [t.to_message() for t in stored.turns] == [t.to_message() for t in session.messages]
+            and stored.chat_complete and stored.feedback is not None,
+        "answers": sum(1 for turn in session.messages if turn.role == "user"),
+        "audio_segments": audio_segments,
+        "feedback_regenerated": repeated_feedback is not feedback,
+        "errors": list(session.errors),
+    }
+
+
+def run_load_test(args, base_url):
+    tts_cache_dir = tempfile.mkdtemp(prefix="interview_bench_tts_")
+    shared = {
+        "tts_cache": TTSCache(disk_dir=tts_cache_dir),
+        # The simulated recordings are random bytes, not audio, so there is nothing to trim
+        "transcription_service": TranscriptionService(max_workers=TRANSCRIPTION_WORKERS, preprocess=False),
+        "evaluation_executor": ThreadPoolExecutor(max_workers=EVALUATION_WORKERS),
+        "job_post_cache": JobPostCache(),
+        "router": ModelRouter(MODEL_ROUTES),
+        "store": InterviewStore(os.path.join(tts_cache_dir, "interviews.db")),
+    }
+    client = get_openai_client("bench", base_url=base_url)
+    metrics.reset()
+    stats_before = fetch_server_stats(base_url)
+
+    if args.trace_memory:
+        gc.collect()
+        tracemalloc.start()
+    baseline_bytes = tracemalloc.get_traced_memory()[0] if args.trace_memory else 0
+
+    started_at = time.perf_counter()
+    # One thread per session, like Streamlit's script threads
+    with ThreadPoolExecutor(max_workers=args.sessions) as executor:
+        results = list(executor.map(lambda number: run_interview(number, client, shared), range(1, args.sessions + 1)))
+    elapsed = time.perf_counter() - started_at
+
+    memory = {
+        "audio_store_bytes_per_session": sum(r["session"].audio_store.total_bytes for r in results) / args.sessions,
+        "engine_reported_bytes_per_session": sum(r["session"].memory_usage()["total_bytes"] for r in results) / args.sessions,
+    }
+    if args.trace_memory:
+        gc.collect()
+        memory["live_bytes_per_session"] = (tracemalloc.get_traced_memory()[0] - baseline_bytes) / args.sessions
+    for result in results:
+        result["session"].close()
+        del result["session"]
+    if args.trace_memory:
+        # Still held once the sessions are dropped: the shared TTS and transcript caches and the metrics
+        gc.collect()
+        memory["retained_bytes_per_session"] = (tracemalloc.get_traced_memory()[0] - baseline_bytes) / args.sessions
+        tracemalloc.stop()
+
+    shared["evaluation_executor"].shutdown()
+    shared["store"].close()
+    stats_after = fetch_server_stats(base_url)
+    api_calls = {name: stats_after.get(name, 0) - stats_before.get(name, 0) for name in stats_after}
+    shutil.rmtree(tts_cache_dir, ignore_errors=True)
+
+    durations = sorted(r["seconds"] for r in results)
+    return {
+        "sessions": args.sessions,
+        "elapsed_seconds": elapsed,
+        "interviews_per_minute": args.sessions / elapsed * 60,
+        "interview_seconds": {"p50": percentile(durations, 0.5), "p95": percentile(durations, 0.95), "max": durations[-1]},
+        "stages": metrics.summary(),
+        "api_calls_per_interview": {name: count / args.sessions for name, count in sorted(api_calls.items())},
+        "tts_cache": shared["tts_cache"].stats(),
+        "models": shared["router"].stats(),
+        "memory": memory,
+        "checks": regression_checks(args.sessions, results, metrics.summary()),
+    }
+
+
+def regression_checks(sessions, results, stages):
+    """Compares call counts with what one interview should cost; a failed check is a regression."""
+    def stage_count(stage):
+        return stages.get(stage, {}).get("count", 0)
+
+    return {
+        "every interview answered all questions": all(r["answers"] == MAX_QUESTIONS for r in results),
+        "one streamed reply per non-final answer": stage_count("llm_stream") == sessions * (MAX_QUESTIONS - 1),
+        "one evaluation per answer": stage_count("llm_evaluation") == sessions * MAX_QUESTIONS,
+        "no whole-conversation feedback call": stage_count("llm_feedback") == 0,
+        "job post preprocessed once for all interviews": stage_count("llm_job_post_summary") == 1,
+        "feedback generated once per interview": not any(r["feedback_regenerated"] for r in results),
+        "every interview saved and resumable": all(r["resumable"] for r in results),
+        "no engine errors": not any(r["errors"] for r in results),
+    }
+
+
+def print_report(report):
+    print(f"\n{report['sessions']} interviews in {report['elapsed_seconds']:.1f}s "
+          f"({report['interviews_per_minute']:.1f} interviews/min)")
+    interview_seconds = report["interview_seconds"]
+    print(f"Interview duration: p50 {interview_seconds['p50']:.2f}s, p95 {interview_seconds['p95']:.2f}s, max {interview_seconds['max']:.2f}s")
+
+    print(f"\n{'stage':<24}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, stats in sorted(report["stages"].items()):
+        quantiles = "".join(f"{stats[key] * 1000:>10.1f}" for key in ("p50", "p95", "p99"))
+        print(f"{stage:<24}{stats['count']:>7}{quantiles}")
+
+    print("\nAPI calls per interview: " + ", ".join(f"{name} {count:.1f}" for name, count in report["api_calls_per_interview"].items()))
+    print(f"TTS cache hit rate: {report['tts_cache']['hit_rate']:.0%}")
+    for model, stats in sorted(report["models"].items()):
+        print(f"Model {model}: {stats['calls'] / report['sessions']:.1f} calls and ${stats['cost_usd'] / report['sessions']:.4f} per interview, "
+              f"{stats['errors']} errors")
+    for name, value in report["memory"].items():
+        print(f"{name.replace('_', ' ').capitalize()}: {value / 1024:.1f} KiB")
+
+    print()
+    for check, passed in report["checks"].items():
+        print(f"[{'PASS' if passed else 'FAIL'}] {check}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent interviews")
+    parser.add_argument("--base-url", help="Use an already running OpenAI-compatible server instead of starting the mock")
+    parser.add_argument("--no-trace-memory", dest="trace_memory", action="store_false",
+                        help="Skip tracemalloc, which slows the sessions down")
+    parser.add_argument("--json", metavar="PATH", help="Also write the report as JSON")
+    args = add_arguments(parser).parse_args()
+
+    server_process = None
+    base_url = args.base_url
+    if base_url is None:
+        server_process, base_url = start_mock_server(args)
+    try:
+        report = run_load_test(args, base_url)
+    finally:
+        if server_process is not None:
+            server_process.terminate()
+            server_process.wait()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+    sys.exit(0 if all(report["checks"].values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
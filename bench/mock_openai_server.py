@@ -0,0 +1,199 @@
+"""Local stand-in for the subset of the OpenAI API used by the interview bot.
+
+Serves streaming and JSON chat completions, speech and transcriptions with
+configurable latencies and payload sizes, so the app and the load test can run
+without real API calls. Point the app at it with OPENAI_BASE_URL in secrets:
+
+    python -m bench.mock_openai_server --port 8000
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILLER_WORDS = (
+    "that is a good point and I would like to hear more about how you approached it in your last role"
+).split()
+
+
+def add_arguments(parser):
+    """Adds the latency and payload options, shared with the load test driver."""
+    parser.add_argument("--chat-first-token-ms", type=float, default=300, help="Delay before the first streamed token")
+    parser.add_argument("--chat-token-ms", type=float, default=15, help="Delay between streamed tokens")
+    parser.add_argument("--chat-tokens", type=int, default=60, help="Tokens (words) per streamed reply")
+    parser.add_argument("--completion-ms", type=float, default=800, help="Latency of non-streaming completions")
+    parser.add_argument("--tts-ms", type=float, default=400, help="Latency of a speech request")
+    parser.add_argument("--tts-bytes-per-char", type=int, default=200, help="MP3 bytes returned per input character")
+    parser.add_argument("--stt-ms", type=float, default=500, help="Latency of a transcription request")
+    parser.add_argument("--stt-words", type=int, default=40, help="Words per transcript")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Random +/- fraction applied to every latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    return parser
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config):
+        super().__init__(address, MockOpenAIHandler)
+        self.config = config
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        self._counter = itertools.count(1)
+
+    def count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def next_id(self):
+        return next(self._counter)
+
+    def sleep(self, milliseconds):
+        jitter = self.config.jitter
+        time.sleep(max(0.0, milliseconds * random.uniform(1 - jitter, 1 + jitter)) / 1000)
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.endswith("/models"):
+            self.server.count("models")
+            self._send_json({"object": "list", "data": [{"id": "gpt-4o", "object": "model", "created": 0, "owned_by": "mock"}]})
+        elif self.path.endswith("/stats"):
+            with self.server._stats_lock:
+                self._send_json(dict(self.server.stats))
+        else:
+            self._send_json({"error": {"message": f"Unknown path {self.path}"}}, status=404)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        config = self.server.config
+        if random.random() < config.error_rate:
+            self.server.count("errors")
+            self._send_json({"error": {"message": "Injected failure", "type": "server_error"}}, status=500)
+        elif self.path.endswith("/chat/completions"):
+            self._chat_completion(json.loads(body))
+        elif self.path.endswith("/audio/speech"):
+            self.server.count("speech")
+            text = json.loads(body)["input"]
+            self.server.sleep(config.tts_ms)
+            self._send_bytes(bytes(len(text) * config.tts_bytes_per_char), "audio/mpeg")
+        elif self.path.endswith("/audio/transcriptions"):
+            self.server.count("transcriptions")
+            self.server.sleep(config.stt_ms)
+            words = [FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(config.stt_words)]
+            self._send_json({"text": f"Answer {self.server.next_id()}: " + " ".join(words) + "."})
+        else:
+            self._send_json({"error": {"message": f"Unknown path {self.path}"}}, status=404)
+
+    def _chat_completion(self, request):
+        config = self.server.config
+        prompt_tokens = sum(len(m.get("content") or "") for m in request["messages"]) // 4
+        if request.get("stream"):
+            self.server.count("chat_stream")
+            self._stream_reply(request, prompt_tokens)
+            return
+
+        system_prompt = request["messages"][0].get("content") or ""
+        if (request.get("response_format") or {}).get("type") == "json_object" and "requirements" in system_prompt:
+            self.server.count("chat_json")
+            content = json.dumps({
+                "skills": ["Python", "PostgreSQL", "Kubernetes", "system design"],
+                "seniority": "senior",
+                "responsibilities": ["build backend services", "mentor engineers"],
+            })
+        elif (request.get("response_format") or {}).get("type") == "json_object":
+            self.server.count("chat_json")
+            content = json.dumps({"score": random.randint(5, 9), "notes": "Clear answer with a concrete example."})
+        else:
+            self.server.count("chat_text")
+            content = "Overall Score: 7\n\nFeedback: The candidate answered clearly and gave relevant examples."
+        self.server.sleep(config.completion_ms)
+        self._send_json({
+            "id": f"chatcmpl-{self.server.next_id()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4, "total_tokens": prompt_tokens + len(content) // 4},
+        })
+
+    def _stream_reply(self, request, prompt_tokens):
+        config = self.server.config
+        reply_id = self.server.next_id()
+        # A sentence every dozen words, so the reply is spoken sentence by sentence
+        words = [f"Reply {reply_id}."] + [
+            FILLER_WORDS[i % len(FILLER_WORDS)] + ("." if i % 12 == 11 else "")
+            for i in range(config.chat_tokens - 1)
+        ]
+        words[-1] = words[-1].rstrip(".") + "?"
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def chunk(payload):
+            data = f"data: {payload}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        base = {"id": f"chatcmpl-{reply_id}", "object": "chat.completion.chunk", "created": int(time.time()), "model": request["model"]}
+        self.server.sleep(config.chat_first_token_ms)
+        for index, word in enumerate(words):
+            if index:
+                self.server.sleep(config.chat_token_ms)
+            delta = {"role": "assistant", "content": word} if index == 0 else {"content": " " + word}
+            chunk(json.dumps({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}))
+        chunk(json.dumps({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words), "total_tokens": prompt_tokens + len(words)}
+            chunk(json.dumps({**base, "choices": [], "usage": usage}))
+        chunk("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, payload, status=200):
+        self._send_bytes(json.dumps(payload).encode("utf-8"), "application/json", status)
+
+    def _send_bytes(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_server(config, host="127.0.0.1", port=0):
+    """Starts the server on a background thread and returns it; port 0 picks a free port."""
+    server = MockOpenAIServer((host, port), config)
+    threading.Thread(target=server.serve_forever, name="mock-openai", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000, help="0 picks a free port")
+    config = add_arguments(parser).parse_args()
+    server = MockOpenAIServer((config.host, config.port), config)
+    host, port = server.server_address[:2]
+    print(f"Mock OpenAI API listening on http://{host}:{port}/v1", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import functools
+import sys
+
+try:
+    import tiktoken
+except ImportError: # Fall back to a character-based estimate
+    tiktoken = None
+
+DEFAULT_TOKEN_BUDGET = 1500
+# Most recent messages that are always sent verbatim
+DEFAULT_KEEP_RECENT = 4
+# Per-message formatting overhead of the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception: # Unknown model, or the encoding file can't be downloaded
+        try:
+            return tiktoken.get_encoding("o200k_base")
+        except Exception:
+            return None
+
+
+def count_tokens(text, model="gpt-4o"):
+    """Counts tokens locally with tiktoken, or estimates ~4 characters per token without it."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+def count_message_tokens(messages, model="gpt-4o"):
+    return sum(count_tokens(m["content"], model) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+class ChatContext:
+    """Keeps the interview prompt within a token budget.
+
+    The system prompt and the most recent messages are sent verbatim. When the prompt
+    grows past the budget, the oldest remaining messages are folded into a rolling
+    summary. Folding is incremental: each call to summarize only receives the previous
+    summary and the newly folded messages, never the whole history again.
+    """
+
+    def __init__(self, token_budget=DEFAULT_TOKEN_BUDGET, keep_recent=DEFAULT_KEEP_RECENT, model="gpt-4o"):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.model = model
+        self.summary = ""
+        self.summarized_count = 0 # Conversation messages already folded into the summary
+        self.usage = [] # Per-turn token usage reports
+        self._token_counts = {} # Message content -> token count, so each message is tokenized once
+
+    def build(self, messages, summarize):
+        """Returns the messages to send for the next turn.
+
+        summarize(previous_summary, new_messages) must return the updated summary text.
+        """
+        system_messages = [m for m in messages if m["role"] == "system"]
+        conversation = [{"role": m["role"], "content": m["content"]} for m in messages if m["role"] != "system"]
+
+        prompt = self._prompt(system_messages, conversation)
+        while self.count_tokens(prompt) > self.token_budget:
+            # Fold one question/answer pair at a time, never touching the most recent messages
+            foldable = len(conversation) - self.keep_recent - self.summarized_count
+            if foldable <= 0:
+                break
+            fold_count = min(2, foldable)
+            new_messages = conversation[self.summarized_count:self.summarized_count + fold_count]
+            self.summary = summarize(self.summary, new_messages)
+            self.summarized_count += fold_count
+            prompt = self._prompt(system_messages, conversation)
+        return prompt
+
+    def count_tokens(self, messages):
+        """Counts the prompt tokens of the messages, reusing the counts of messages seen before."""
+        total = 0
+        for m in messages:
+            content = m["content"]
+            if content not in self._token_counts:
+                self._token_counts[content] = count_tokens(content, self.model) + MESSAGE_OVERHEAD_TOKENS
+            total += self._token_counts[content]
+        return total
+
+    def record_usage(self, turn, prompt_messages, full_messages, usage=None):
+        """Stores the token usage of a turn, comparing the sent prompt with the full history."""
+        report = {
+            "turn": turn,
+            "prompt_tokens_estimated": self.count_tokens(prompt_messages),
+            "full_history_tokens": self.count_tokens(full_messages),
+            "summarized_messages": self.summarized_count,
+        }
+        if usage is not None:
+            report["prompt_tokens"] = usage.prompt_tokens
+            report["completion_tokens"] = usage.completion_tokens
+        self.usage.append(report)
+        return report
+
+    def memory_bytes(self):
+        """Approximate bytes held by the summary and token count memo; the memo keys are shared with the messages."""
+        return sys.getsizeof(self.summary) + sys.getsizeof(self._token_counts) + sys.getsizeof(self.usage)
+
+    def _prompt(self, system_messages, conversation):
+        prompt = [{"role": m["role"], "content": m["content"]} for m in system_messages]
+        if self.summary:
+            prompt.append({"role": "system", "content": f"Summary of the earlier part of the interview: {self.summary}"})
+        return prompt + conversation[self.summarized_count:]
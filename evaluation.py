@@ -0,0 +1,86 @@
+import json
+from concurrent.futures import Future
+
+from metrics import metrics
+
+EVALUATION_SYSTEM_PROMPT = """You are a helpful tool that evaluates one answer of an interviewee.
+Score the answer from 1 to 10 and write one or two sentences of notes on its strengths and weaknesses.
+Reply only with JSON in this format: {"score": <integer 1-10>, "notes": "<notes>"}"""
+
+
+def evaluate_answer(client, question, answer, position="", model="gpt-4o", router=None):
+    """Scores a single question/answer pair. Safe to call from worker threads.
+
+    With a ModelRouter, the model comes from its "evaluation" route instead of model.
+    """
+    request = {
+        "response_format": {"type": "json_object"},
+        "messages": [
+            {"role": "system", "content": EVALUATION_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Position: {position}\nQuestion: {question}\nAnswer: {answer}"}
+        ],
+    }
+    with metrics.timer("llm_evaluation") as counters:
+        if router is not None:
+            completion = router.create(client, "evaluation", **request)
+        else:
+            completion = client.chat.completions.create(model=model, **request)
+        if completion.usage is not None:
+            counters["prompt_tokens"] = completion.usage.prompt_tokens
+            counters["completion_tokens"] = completion.usage.completion_tokens
+    result = json.loads(completion.choices[0].message.content)
+    return {
+        "question": question,
+        "answer": answer,
+        "score": int(result["score"]),
+        "notes": str(result.get("notes", "")).strip(),
+    }
+
+
+def merge_evaluations(evaluations):
+    """Builds the final feedback text from per-question results, in the usual feedback format."""
+    overall_score = round(sum(e["score"] for e in evaluations) / len(evaluations))
+    notes = "\n\n".join(
+        f"Question {number} ({e['score']}/10): {e['notes']}"
+        for number, e in enumerate(evaluations, start=1)
+    )
+    return f"Overall Score: {overall_score}\n\nFeedback:\n\n{notes}"
+
+
+class IncrementalEvaluator:
+    """Scores each answer in the background as soon as it is sent.
+
+    Results are kept in answer order. The final feedback only has to merge them,
+    instead of sending the whole conversation to one large evaluation call.
+    """
+
+    def __init__(self, executor, model="gpt-4o", router=None):
+        self._executor = executor
+        self.model = model
+        self.router = router
+        self._futures = []
+
+    def __len__(self):
+        return len(self._futures)
+
+    def submit(self, client, question, answer, position=""):
+        future = self._executor.submit(evaluate_answer, client, question, answer, position, self.model, self.router)
+        self._futures.append(future)
+        return future
+
+    def add_result(self, result):
+        """Adds an evaluation computed earlier, e.g. one restored from the interview store."""
+        future = Future()
+        future.set_result(result)
+        self._futures.append(future)
+
+    def results(self, timeout=None):
+        """Waits for all submitted evaluations and returns the ones that succeeded, in order."""
+        results = []
+        for future in self._futures:
+            try:
+                results.append(future.result(timeout=timeout))
+            except Exception:
+                # A failed evaluation only drops that answer from the merge
+                continue
+        return results
@@ -0,0 +1,654 @@
+import asyncio
+import hashlib
+import json
+import re
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from audio_store import DEFAULT_BYTE_BUDGET, AudioStore
+from chat_context import DEFAULT_KEEP_RECENT, DEFAULT_TOKEN_BUDGET, ChatContext
+from evaluation import IncrementalEvaluator, merge_evaluations
+from interview_store import EVALUATION, FEEDBACK, STATE, TURN
+from metrics import metrics
+from model_router import ModelRouter
+from session_memory import CandidateProfile, Turn, text_bytes
+from speech_pipeline import SpeechPipeline
+from transcription import TranscriptionService
+
+# Number of answers the candidate gives in one interview
+MAX_QUESTIONS = 5
+
+INTRO_AUDIO_KEY = "assistant_initial_intro"
+FEEDBACK_AUDIO_KEY = "feedback_summary"
+
+FEEDBACK_SYSTEM_PROMPT = """You are a helpful tool that provides feedback on an interviewee performance.
+            Before the Feedback give a score of 1 to 10.
+            Follow this format:
+            Overall Score: //Your score
+            Feedback: //Here you put your feedback
+            Give only the feedback do not ask any additional questions.
+            """
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a concise running summary of a job interview. Keep the questions asked and the key facts "
+    "from the candidate's answers. Reply with the updated summary only."
+)
+
+
+def build_system_prompt(profile, job_post=None, skill_match=None):
+    """Builds the interviewer system prompt from the candidate profile.
+
+    With a preprocessed job_post, its compact requirements (and the candidate's
+    skill_match against them) replace the full text of the posting.
+    """
+    system_prompt_content = (
+        f"You are an HR executive that interviews an interviewee called {profile.name} "
+        f"with experience: {profile.experience} and skills: {profile.skills}. "
+        f"You should interview him for the position {profile.position} "
+        f"at the company {profile.company}."
+    )
+    # Conditionally add the job post information to the prompt
+    if job_post is not None and job_post.summary:
+        system_prompt_content += f" The key requirements of the job are: {job_post.summary}."
+        if skill_match and skill_match["matched"]:
+            system_prompt_content += f" The candidate's profile already mentions: {', '.join(skill_match['matched'])}."
+        if skill_match and skill_match["gaps"]:
+            system_prompt_content += f" Focus your questions on the requirements the profile does not show: {', '.join(skill_match['gaps'])}."
+    elif profile.job_post:
+        system_prompt_content += f" The job post description is as follows: {profile.job_post_text}."
+    return system_prompt_content
+
+
+def build_intro(profile):
+    """Builds the interviewer's fixed first question."""
+    return (
+        f"Hello {profile.name}. My name is AI HR Manager from {profile.company}."
+        f"Thank you for applying for the {profile.position} position. "
+        "To start, could you please tell me what you know about our company or why you are interested in this particular position?"
+    )
+
+
+def conversation_hash(turns):
+    """Returns a stable hash of the conversation, used as the feedback cache key."""
+    payload = json.dumps([[t.role, t.content] for t in turns], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def parse_feedback_score(feedback_text):
+    """Extracts the 'Overall Score' value from the feedback text, if present."""
+    match = re.search(r"Overall Score:\s*(\d+(?:\.\d+)?)", feedback_text or "")
+    return match.group(1) if match else None
+
+
+async def iterate_in_thread(make_iterable):
+    """Runs a blocking iterator (such as an OpenAI stream) in a worker thread and yields its items asynchronously."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+
+    def produce():
+        try:
+            for item in make_iterable():
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    producer = loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        await producer
+
+
+class InterviewSession:
+    """Runs one interview independently of Streamlit.
+
+    The asyncio API (start, answer, next_question, feedback, transcribe) performs the
+    LLM, TTS and transcription calls of each step and keeps the interview state, so a
+    UI only has to render it. Blocking SDK calls run in worker threads, which lets
+    independent calls of a step overlap: answers are scored while the next question is
+    generated, and the reply is spoken sentence by sentence while it streams.
+    """
+
+    def __init__(
+        self,
+        client,
+        profile,
+        *,
+        model="gpt-4o",
+        feedback_model="gpt-4o",
+        summary_model="gpt-4o-mini",
+        voice="alloy",
+        pipelined_tts=True,
+        tts_workers=3,
+        context_token_budget=DEFAULT_TOKEN_BUDGET,
+        context_keep_recent=DEFAULT_KEEP_RECENT,
+        audio_byte_budget=DEFAULT_BYTE_BUDGET,
+        audio_spill_to_disk=False,
+        tts_cache=None,
+        transcription_service=None,
+        evaluation_executor=None,
+        job_post_cache=None,
+        router=None,
+        store=None,
+        interview_id=None,
+    ):
+        self.client = client
+        # A CandidateProfile, or a dict of the setup inputs
+        self.profile = profile if isinstance(profile, CandidateProfile) else CandidateProfile.from_inputs(profile)
+        self.model = model
+        self.feedback_model = feedback_model
+        self.summary_model = summary_model
+        self.voice = voice
+        self.pipelined_tts = pipelined_tts
+        self.tts_workers = tts_workers
+        self.tts_cache = tts_cache
+        self.job_post_cache = job_post_cache
+        # With an InterviewStore, every turn and result is saved, so the interview can be resumed by its ID
+        self.store = store
+        self.interview_id = interview_id or uuid.uuid4().hex
+        self.transcription_service = transcription_service or TranscriptionService()
+        self.audio_store = AudioStore(byte_budget=audio_byte_budget, spill_to_disk=audio_spill_to_disk)
+        self.chat_context = ChatContext(token_budget=context_token_budget, keep_recent=context_keep_recent, model=model)
+        # Picks the model of each LLM stage; without a router, each stage uses the model given above
+        self.router = router or ModelRouter.single(
+            follow_up=model, evaluation=feedback_model, feedback=feedback_model, summary=summary_model, job_post=summary_model
+        )
+        # Answer scoring runs on this pool, usually shared by all sessions
+        self._background = evaluation_executor or ThreadPoolExecutor(max_workers=2)
+        # Work the next reply waits for runs on a pool of this interview, so it never queues behind scoring calls
+        self._prepare = ThreadPoolExecutor(max_workers=2, thread_name_prefix="reply_prepare")
+        self.evaluator = IncrementalEvaluator(self._background, model=feedback_model, router=self.router)
+
+        self.system_prompt = ""
+        self.job_post = None # The shared, preprocessed job post (a JobPost), when a cache is used
+        self.skill_match = None
+        self.messages = [] # Turn records of the conversation, without the system prompt
+        self.user_message_count = 0
+        self.awaiting_user_action = False
+        self.chat_complete = False
+        self.current_ai_response_text = ""
+        self.current_ai_audio_key = ""
+        self.current_ai_audio_autoplay = True # False when the audio was already played while it was generated
+        self.feedback_audio_key = ""
+        self.errors = [] # Non-fatal errors for the UI to show
+        self.last_reply_model = None # The model that generated the last interviewer reply
+        self.turn_timings = [] # Per-reply latency from the answer to the first token and first audio
+        self._history_lines = [] # The turns formatted for display, see history_markdown()
+        self._history_turn_count = 0
+        self._feedback_cache = {} # Feedback results keyed by conversation hash
+        self._prefetch = None
+        self._prefetch_length = None
+        self._system_prompt_ready = None # Future of the job post preprocessing started by start()
+        self.last_active = time.monotonic()
+        self.expired = False # Set once an idle interview has been evicted
+
+    @property
+    def started(self):
+        return bool(self.messages)
+
+    async def start(self):
+        """Builds the system prompt and speaks the interviewer's introduction."""
+        self.touch()
+        if self.started:
+            return
+        if self.store is not None:
+            try:
+                self.store.create(self.interview_id, self.profile)
+            except Exception as e: # Reported like a failed _log(); the interview goes on unsaved
+                self.errors.append(f"Error saving the interview: {e}")
+        intro = build_intro(self.profile)
+        intro_turn = Turn("assistant", intro, "")
+        self.messages = [intro_turn]
+        # The intro does not depend on the job post, so the posting is preprocessed in the background
+        # while the intro is shown and spoken; the first reply waits for the system prompt
+        self._system_prompt_ready = self._prepare.submit(self._prepare_system_prompt)
+        intro_audio = await self._text_to_audio(intro, INTRO_AUDIO_KEY)
+        if intro_audio:
+            intro_turn.audio_key = INTRO_AUDIO_KEY
+        self.current_ai_response_text = intro
+        self.current_ai_audio_key = intro_turn.audio_key
+        self.current_ai_audio_autoplay = True
+        self.awaiting_user_action = True # Wait for the user to click "Next Question"
+        self._log_turn(intro_turn)
+        self._log_state()
+
+    async def next_question(self):
+        """Moves from listening to the interviewer to answering."""
+        self.touch()
+        self.awaiting_user_action = False
+        # The intro is not a reply to an answer, so it does not count as a turn
+        if any(t.role == "user" for t in self.messages):
+            self.user_message_count += 1
+        self._log_state()
+
+    def prefetch(self):
+        """Uses idle time, while the candidate listens or answers, to prepare the next reply.
+
+        Warms a pooled connection and tokenizes (and, if needed, summarizes) the history in
+        the background, so answer() can start the completion right away. Runs once per turn,
+        so it is safe to call on every rerun.
+        """
+        if self.chat_complete or self._prefetch_length == len(self.messages):
+            return
+        self._prefetch_length = len(self.messages)
+        # The reply waits for the prompt preparation only, not for the connection warm-up
+        self._prepare.submit(self._warm_connection)
+        self._prefetch = self._prepare.submit(self._prepare_next_turn, [t.to_message() for t in self.messages])
+
+    async def answer(self, text, on_text=None, on_audio_segment=None):
+        """Records the answer and generates the interviewer's reply, unless it was the last answer.
+
+        on_text(response_text) is called as the reply streams in; on_audio_segment(mp3_bytes)
+        is called for each spoken sentence in order, while generation continues.
+        """
+        self.touch()
+        answer_turn = Turn("user", text, "")
+        self.messages.append(answer_turn)
+        self._log_turn(answer_turn)
+
+        # Score this answer in the background, so the final feedback only has to merge results
+        answered_question = next(
+            (t.content for t in reversed(self.messages[:-1]) if t.role == "assistant"), ""
+        )
+        self._submit_evaluation(len(self.evaluator), answered_question, text)
+
+        if self.user_message_count < MAX_QUESTIONS - 1:
+            await self._reply(on_text, on_audio_segment)
+            self._log_state()
+        else:
+            self.finish()
+
+    @property
+    def reply_missing(self):
+        """True when the last answer has no interviewer reply, because generating it failed."""
+        return bool(self.messages) and self.messages[-1].role == "user" and not self.chat_complete
+
+    async def retry_reply(self, on_text=None, on_audio_segment=None):
+        """Generates the interviewer's reply to the last answer again, after it failed."""
+        self.touch()
+        if not self.reply_missing:
+            return
+        await self._reply(on_text, on_audio_segment)
+        self._log_state()
+
+    def finish(self):
+        """Ends the interview early or after the last answer."""
+        if self.chat_complete:
+            return
+        self.chat_complete = True
+        self.awaiting_user_action = False
+        self._log_state()
+
+    def restore(self, stored):
+        """Continues an interview loaded from the store (a StoredInterview), e.g. after a refresh or a server restart.
+
+        Audio is not stored, so earlier clips are not replayed. Answer scores that had
+        finished are reused; the others are computed again.
+        """
+        self.interview_id = stored.id
+        self.profile = stored.profile
+        # An interview saved before its job post was preprocessed continues with the full posting
+        self.system_prompt = stored.system_prompt or build_system_prompt(self.profile)
+        self.messages = list(stored.turns)
+        self.user_message_count = stored.user_message_count
+        self.awaiting_user_action = stored.awaiting_user_action
+        self.chat_complete = stored.chat_complete
+        self._history_lines = []
+        self._history_turn_count = 0
+        self.current_ai_response_text = next((t.content for t in reversed(self.messages) if t.role == "assistant"), "")
+        self.current_ai_audio_key = ""
+        for index, (question, answer) in enumerate(stored.answers):
+            if index in stored.evaluations:
+                self.evaluator.add_result(stored.evaluations[index])
+            else:
+                self._submit_evaluation(index, question, answer)
+        if stored.feedback is not None:
+            self._feedback_cache[conversation_hash(self.messages)] = {
+                "score": stored.feedback["score"],
+                "text": stored.feedback["text"],
+                "audio_bytes": None,
+                "answer_evaluations": stored.feedback["answer_evaluations"],
+            }
+
+    async def transcribe(self, audio_bytes, file_name="answer.webm"):
+        """Transcribes a recorded answer without blocking the event loop."""
+        future = self.transcription_service.submit(self.client, audio_bytes, file_name=file_name)
+        return await asyncio.wrap_future(future)
+
+    async def feedback(self):
+        """Returns the feedback for the conversation so far, generating it only once."""
+        self.touch()
+        conversation_key = conversation_hash(self.messages)
+        cached_feedback = self._feedback_cache.get(conversation_key)
+        if cached_feedback is not None:
+            return cached_feedback
+
+        # Merge the per-answer scores computed during the interview
+        answer_evaluations = await asyncio.to_thread(self.evaluator.results)
+        if answer_evaluations:
+            feedback_text = merge_evaluations(answer_evaluations)
+        else:
+            # Nothing was scored in the background (no answers, or every evaluation failed): evaluate the whole conversation
+            feedback_text = await asyncio.to_thread(self._evaluate_conversation)
+
+        feedback_audio_bytes = await self._text_to_audio(feedback_text, FEEDBACK_AUDIO_KEY)
+        if feedback_audio_bytes:
+            self.feedback_audio_key = FEEDBACK_AUDIO_KEY
+
+        cached_feedback = {
+            "score": parse_feedback_score(feedback_text),
+            "text": feedback_text,
+            "audio_bytes": feedback_audio_bytes,
+            "answer_evaluations": answer_evaluations,
+        }
+        self._feedback_cache[conversation_key] = cached_feedback
+        self._log(FEEDBACK, {
+            "score": cached_feedback["score"],
+            "text": feedback_text,
+            "answer_evaluations": answer_evaluations,
+            "regenerated": False,
+        })
+        return cached_feedback
+
+    def close(self):
+        """Releases the audio held by this interview."""
+        self.audio_store.clear()
+
+    def touch(self):
+        """Marks the interview as active, postponing its eviction."""
+        self.last_active = time.monotonic()
+
+    def expire(self):
+        """Evicts an idle interview: releases its audio, conversation and cached results."""
+        self.expired = True
+        self.close()
+        self.system_prompt = ""
+        self.job_post = None
+        self.skill_match = None
+        self.messages = []
+        self.chat_context = ChatContext(
+            token_budget=self.chat_context.token_budget, keep_recent=self.chat_context.keep_recent, model=self.model
+        )
+        self._feedback_cache.clear()
+        self._history_lines = []
+        self._history_turn_count = 0
+        self._prefetch = None
+        self.current_ai_response_text = ""
+        self.current_ai_audio_key = ""
+        self.awaiting_user_action = False
+
+    def memory_usage(self):
+        """Approximate bytes held by this interview, by kind."""
+        usage = {
+            "audio_bytes": self.audio_store.total_bytes,
+            "conversation_bytes": text_bytes([self.system_prompt, self.current_ai_response_text])
+                + sum(sys.getsizeof(t) + sys.getsizeof(t.content) for t in self.messages),
+            "context_bytes": self.chat_context.memory_bytes(),
+            "feedback_bytes": text_bytes(f["text"] for f in self._feedback_cache.values()),
+            "history_bytes": text_bytes(self._history_lines),
+        }
+        usage["total_bytes"] = sum(usage.values())
+        return usage
+
+    def history_markdown(self):
+        """The conversation as one Markdown text, formatting only the turns added since the last call."""
+        for turn in self.messages[self._history_turn_count:]:
+            if turn.role == "user":
+                self._history_lines.append(f"**You:** {turn.content}")
+            elif turn.role == "assistant":
+                self._history_lines.append(f"**Interviewer:** {turn.content}")
+        self._history_turn_count = len(self.messages)
+        return "\n\n".join(self._history_lines)
+
+    def synthesize_speech(self, text, cache=True):
+        """Returns the MP3 bytes for the text. Safe to call from worker threads.
+
+        With cache=True the TTS cache is used when there is one; generated replies pass
+        cache=False, since their sentences never repeat and would only evict the prompts that do.
+        """
+        def synthesize():
+            with metrics.timer("tts_synthesis", characters=len(text)) as counters:
+                response = self.client.audio.speech.create(model="tts-1", voice=self.voice, input=text)
+                counters["bytes"] = len(response.content)
+            return response.content
+        if self.tts_cache is None or not cache:
+            return synthesize()
+        return self.tts_cache.get_or_synthesize("tts-1", self.voice, text, synthesize)
+
+    def _synthesize_reply_speech(self, text):
+        return self.synthesize_speech(text, cache=False)
+
+    async def _text_to_audio(self, text, audio_key, cache=True):
+        try:
+            audio_bytes = await asyncio.to_thread(self.synthesize_speech, text, cache)
+        except Exception as e:
+            self.errors.append(f"Error converting text to audio: {e}")
+            return None
+        with metrics.timer("audio_store_write", bytes=len(audio_bytes)):
+            self.audio_store.put(audio_key, audio_bytes)
+        return audio_bytes
+
+    async def _reply(self, on_text, on_audio_segment):
+        answered_at = time.perf_counter()
+        timing = {"turn": self.user_message_count + 1, "model": None, "time_to_first_token": None, "time_to_first_audio": None}
+        self.turn_timings.append(timing)
+
+        # Let the prefetch finish first; it shares the token counts and summary with this turn
+        if self._prefetch is not None:
+            try:
+                await asyncio.wrap_future(self._prefetch)
+            except Exception:
+                pass # build() below retries anything the prefetch could not do
+        await asyncio.to_thread(self._wait_for_system_prompt)
+        # Send the system prompt and recent turns verbatim, with older turns summarized
+        context_messages = await asyncio.to_thread(self.chat_context.build, self._prompt_messages(), self._summarize)
+
+        def play(audio_segment):
+            if timing["time_to_first_audio"] is None:
+                timing["time_to_first_audio"] = time.perf_counter() - answered_at
+                metrics.observe("reply_first_audio", timing["time_to_first_audio"])
+            if on_audio_segment:
+                on_audio_segment(audio_segment)
+
+        speech_audio_key = f"assistant_response_{self.user_message_count}"
+        # In pipelined mode each finished sentence is synthesized and played while the stream continues
+        speech_pipeline = SpeechPipeline(self._synthesize_reply_speech, max_workers=self.tts_workers) if self.pipelined_tts else None
+        stream_usage = None
+        response_text = ""
+        stream_started_at = time.perf_counter()
+        try:
+            async for chunk in self._stream_completion("follow_up", context_messages):
+                if chunk.usage is not None: # Sent in the final chunk, which has no choices
+                    stream_usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content is not None:
+                    if timing["time_to_first_token"] is None:
+                        timing["time_to_first_token"] = time.perf_counter() - answered_at
+                        metrics.observe("llm_first_token", time.perf_counter() - stream_started_at)
+                    response_text += chunk.choices[0].delta.content
+                    if on_text:
+                        on_text(response_text)
+                    if speech_pipeline:
+                        speech_pipeline.push(chunk.choices[0].delta.content)
+                        for audio_segment in speech_pipeline.ready_segments():
+                            play(audio_segment)
+
+            metrics.observe(
+                "llm_stream",
+                time.perf_counter() - stream_started_at,
+                prompt_tokens=stream_usage.prompt_tokens if stream_usage else None,
+                completion_tokens=stream_usage.completion_tokens if stream_usage else None,
+            )
+            self.chat_context.record_usage(self.user_message_count + 1, context_messages, self._prompt_messages(), stream_usage)
+            timing["model"] = self.last_reply_model
+
+            if speech_pipeline:
+                speech_pipeline.finish()
+                async for audio_segment in speech_pipeline.remaining_segments_async():
+                    play(audio_segment)
+                for error in speech_pipeline.errors:
+                    self.errors.append(f"Error converting text to audio: {error}")
+                # Keep the joined clip for replay; it has already been played once
+                if speech_pipeline.segments:
+                    self.audio_store.put(speech_audio_key, speech_pipeline.audio_bytes())
+                else:
+                    speech_audio_key = ""
+                self.current_ai_audio_autoplay = not on_audio_segment
+            else:
+                await self._text_to_audio(response_text, speech_audio_key, cache=False)
+                timing["time_to_first_audio"] = time.perf_counter() - answered_at # Playback starts with the whole clip
+                metrics.observe("reply_first_audio", timing["time_to_first_audio"])
+                self.current_ai_audio_autoplay = True
+
+            self.messages.append(Turn("assistant", response_text, speech_audio_key))
+            self._log_turn(self.messages[-1])
+            self.current_ai_response_text = response_text
+            self.current_ai_audio_key = speech_audio_key
+            self.awaiting_user_action = True
+        except Exception as e:
+            if speech_pipeline:
+                speech_pipeline.close()
+            if not response_text:
+                # Nothing was generated: the answer is kept and only the reply is retried (see retry_reply)
+                self.errors.append(f"Error generating the interviewer's reply: {e}")
+                return
+            self.errors.append(f"Error generating or playing speech: {e}. Falling back to text-only.")
+            self.messages.append(Turn("assistant", response_text, ""))
+            self._log_turn(self.messages[-1])
+            self.awaiting_user_action = False
+            self.user_message_count += 1
+
+    async def _stream_completion(self, stage, messages):
+        """Streams a chat completion from the stage's route, falling back to the next model until the first chunk arrives."""
+        attempts = list(self.router.attempts(self.client, stage))
+        for index, (model, client) in enumerate(attempts):
+            started_at = time.perf_counter()
+            stream = iterate_in_thread(lambda model=model, client=client: client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},
+            ))
+            try:
+                first_chunk = await stream.__anext__()
+            except Exception:
+                await stream.aclose()
+                self.router.record(stage, model, time.perf_counter() - started_at, error=True)
+                if index == len(attempts) - 1:
+                    raise
+                continue
+
+            # Once the reply has started it can't switch models; later errors go to the caller
+            first_chunk_latency = time.perf_counter() - started_at
+            if stage == "follow_up":
+                self.last_reply_model = model
+            usage = None
+            try:
+                yield first_chunk
+                async for chunk in stream:
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                    yield chunk
+            except Exception:
+                self.router.record(stage, model, first_chunk_latency, error=True)
+                raise
+            self.router.record(stage, model, first_chunk_latency, usage=usage)
+            return
+
+    def _prepare_system_prompt(self):
+        """Preprocesses the job post, then builds and saves the system prompt. Runs on the reply preparation pool."""
+        if self.job_post_cache is not None and self.profile.job_post:
+            try:
+                self.job_post = self.job_post_cache.get_or_extract(self.client, self.profile.job_post_text, self.router)
+                self.skill_match = self.job_post.match_candidate(self.profile.skills, self.profile.experience)
+            except Exception:
+                # The prompt falls back to the full job post
+                self.job_post = None
+                self.skill_match = None
+        self.system_prompt = build_system_prompt(self.profile, self.job_post, self.skill_match)
+        self._log_state(system_prompt=self.system_prompt)
+
+    def _wait_for_system_prompt(self):
+        if self._system_prompt_ready is not None:
+            self._system_prompt_ready.result()
+
+    def _submit_evaluation(self, index, question, answer):
+        future = self.evaluator.submit(self.client, question, answer, self.profile.position)
+        if self.store is not None:
+            def save(future):
+                if future.exception() is None:
+                    self._log(EVALUATION, {"answer": index, "result": future.result()})
+            future.add_done_callback(save)
+
+    def _log(self, kind, data):
+        """Appends an event to the stored log of this interview; a failed write is reported, not raised."""
+        if self.store is None:
+            return
+        try:
+            self.store.append(self.interview_id, kind, data)
+        except Exception as e:
+            self.errors.append(f"Error saving the interview: {e}")
+
+    def _log_turn(self, turn):
+        self._log(TURN, {"role": turn.role, "content": turn.content})
+
+    def _log_state(self, **extra):
+        self._log(STATE, {
+            "user_message_count": self.user_message_count,
+            "awaiting_user_action": self.awaiting_user_action,
+            "chat_complete": self.chat_complete,
+            **extra,
+        })
+
+    def _prompt_messages(self):
+        """The full conversation in the chat completions format, led by the system prompt."""
+        return [{"role": "system", "content": self.system_prompt}] + [t.to_message() for t in self.messages]
+
+    def _warm_connection(self):
+        try:
+            # Any cheap request opens (or keeps alive) a connection in the shared pool
+            self.client.with_options(max_retries=0, timeout=5.0).models.list()
+        except Exception:
+            pass
+
+    def _prepare_next_turn(self, turn_messages):
+        self._wait_for_system_prompt()
+        self.chat_context.build([{"role": "system", "content": self.system_prompt}] + turn_messages, self._summarize)
+
+    def _summarize(self, summary, new_messages):
+        """Folds new messages into the rolling summary of the interview so far."""
+        new_turns = "\n".join(f"{m['role']}: {m['content']}" for m in new_messages)
+        with metrics.timer("llm_summary"):
+            completion = self.router.create(
+                self.client,
+                "summary",
+                messages=[
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                    {"role": "user", "content": f"Current summary: {summary or '(none)'}\n\nNew part of the interview:\n{new_turns}"}
+                ]
+            )
+        return completion.choices[0].message.content
+
+    def _evaluate_conversation(self):
+        conversation_history = "\n".join([f"{turn.role}: {turn.content}" for turn in self.messages])
+
+        with metrics.timer("llm_feedback"):
+            feedback_completion = self.router.create(
+                self.client,
+                "feedback",
+                messages=[
+                    {"role": "system", "content": FEEDBACK_SYSTEM_PROMPT},
+                    {"role": "user", "content": f"This is the interview you need to evaluate. Keep in mind that you are only a tool. And you shouldn't engage in any conversation: {conversation_history}"}
+                ]
+            )
+        return feedback_completion.choices[0].message.content
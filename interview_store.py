@@ -0,0 +1,177 @@
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from metrics import metrics
+from session_memory import CandidateProfile, Turn
+
+DEFAULT_DB_PATH = "interviews.db"
+
+# Interviews are stored as a header row plus an append-only log of events. Rows of
+# the log are never updated or deleted: resuming replays it, and regenerated
+# feedback is appended next to the original.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interviews (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    candidate TEXT NOT NULL,
+    experience TEXT NOT NULL,
+    skills TEXT NOT NULL,
+    company TEXT NOT NULL,
+    position TEXT NOT NULL,
+    job_post TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS interviews_candidate ON interviews (candidate);
+CREATE INDEX IF NOT EXISTS interviews_company ON interviews (company);
+CREATE INDEX IF NOT EXISTS interviews_position ON interviews (position);
+
+CREATE TABLE IF NOT EXISTS events (
+    interview_id TEXT NOT NULL REFERENCES interviews (id),
+    seq INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    kind TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (interview_id, seq)
+);
+"""
+
+# Event kinds of the log
+TURN = "turn" # {"role", "content"}
+STATE = "state" # {"system_prompt"?, "user_message_count", "awaiting_user_action", "chat_complete"}
+EVALUATION = "evaluation" # {"answer": index of the answer, "result": evaluate_answer() result}
+FEEDBACK = "feedback" # {"score", "text", "answer_evaluations", "regenerated"}
+
+
+@dataclass
+class StoredInterview:
+    """An interview rebuilt from its event log."""
+
+    id: str
+    created_at: float
+    profile: CandidateProfile
+    system_prompt: str = ""
+    turns: list = field(default_factory=list)
+    user_message_count: int = 0
+    awaiting_user_action: bool = False
+    chat_complete: bool = False
+    evaluations: dict = field(default_factory=dict) # Answer index -> result
+    feedback: Optional[dict] = None # The latest feedback
+
+    @property
+    def answers(self):
+        """(question, answer) pairs, each answer with the interviewer message before it."""
+        pairs = []
+        question = ""
+        for turn in self.turns:
+            if turn.role == "assistant":
+                question = turn.content
+            elif turn.role == "user":
+                pairs.append((question, turn.content))
+        return pairs
+
+
+class InterviewStore:
+    """SQLite store of interviews, shared by all sessions of the process.
+
+    One connection is shared by all threads and serialized with a lock; appends are
+    single short transactions, and WAL mode lets a batch job read while the app writes.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def create(self, interview_id, profile):
+        """Adds the header of a new interview; does nothing if it already exists."""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO interviews (id, created_at, candidate, experience, skills, company, position, job_post) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (interview_id, time.time(), profile.name, profile.experience, profile.skills,
+                 profile.company, profile.position, profile.job_post_text),
+            )
+
+    def append(self, interview_id, kind, data):
+        """Appends one event to the log of the interview."""
+        payload = json.dumps(data, ensure_ascii=False)
+        with metrics.timer("store_append", bytes=len(payload)), self._lock:
+            self._connection.execute(
+                "INSERT INTO events (interview_id, seq, created_at, kind, data) "
+                "SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ?, ? FROM events WHERE interview_id = ?",
+                (interview_id, time.time(), kind, payload, interview_id),
+            )
+
+    def load(self, interview_id):
+        """Returns the interview as a StoredInterview, or None if there is no such interview."""
+        with metrics.timer("store_load"), self._lock:
+            header = self._connection.execute(
+                "SELECT id, created_at, candidate, experience, skills, company, position, job_post FROM interviews WHERE id = ?",
+                (interview_id,),
+            ).fetchone()
+            if header is None:
+                return None
+            events = self._connection.execute(
+                "SELECT kind, data FROM events WHERE interview_id = ? ORDER BY seq", (interview_id,)
+            ).fetchall()
+
+        interview = StoredInterview(id=header[0], created_at=header[1], profile=CandidateProfile.from_inputs({
+            "name": header[2], "experience": header[3], "skills": header[4],
+            "company": header[5], "position": header[6], "job_post": header[7],
+        }))
+        for kind, data in events:
+            data = json.loads(data)
+            if kind == TURN:
+                interview.turns.append(Turn(data["role"], data["content"], ""))
+            elif kind == STATE:
+                interview.system_prompt = data.get("system_prompt", interview.system_prompt)
+                interview.user_message_count = data["user_message_count"]
+                interview.awaiting_user_action = data["awaiting_user_action"]
+                interview.chat_complete = data["chat_complete"]
+            elif kind == EVALUATION:
+                interview.evaluations[data["answer"]] = data["result"]
+            elif kind == FEEDBACK:
+                interview.feedback = data
+        return interview
+
+    def find(self, candidate=None, company=None, position=None, completed=None, limit=None):
+        """Lists stored interviews, newest first, as dicts of their header fields.
+
+        The filters match exactly and use the indexes; completed=True keeps only finished
+        interviews, completed=False only unfinished ones.
+        """
+        query = "SELECT id, created_at, candidate, company, position FROM interviews"
+        conditions, parameters = [], []
+        for column, value in (("candidate", candidate), ("company", company), ("position", position)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        if completed is not None:
+            # The interview is finished if its latest state says so
+            conditions.append(
+                "IFNULL((SELECT json_extract(data, '$.chat_complete') FROM events "
+                "WHERE interview_id = interviews.id AND kind = 'state' ORDER BY seq DESC LIMIT 1), 0) = ?"
+            )
+            parameters.append(1 if completed else 0)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters.append(limit)
+        with self._lock:
+            rows = self._connection.execute(query, parameters).fetchall()
+        return [
+            {"id": row[0], "created_at": row[1], "candidate": row[2], "company": row[3], "position": row[4]}
+            for row in rows
+        ]
@@ -0,0 +1,189 @@
+import functools
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from metrics import metrics
+
+DEFAULT_CACHE_ENTRIES = 256
+# Local model for matching the candidate against the requirements
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# Cosine similarity from which a requirement counts as covered by the candidate
+SKILL_MATCH_THRESHOLD = 0.6
+
+MAX_SKILLS = 10
+MAX_RESPONSIBILITIES = 5
+
+REQUIREMENTS_SYSTEM_PROMPT = """You are a helpful tool that extracts the key requirements from a job post.
+Reply only with JSON in this format: {"skills": ["<skill>", ...], "seniority": "<level>", "responsibilities": ["<responsibility>", ...]}
+List at most 10 skills and 5 responsibilities, each in a few words."""
+
+
+def normalize_job_post(text):
+    """Collapses whitespace so re-pasted copies of a posting share one entry."""
+    return " ".join(text.split())
+
+
+def job_post_key(text):
+    return hashlib.sha256(normalize_job_post(text).casefold().encode("utf-8")).hexdigest()
+
+
+def extract_requirements(client, text, model="gpt-4o-mini", router=None):
+    """Asks the model for the skills, seniority and key responsibilities of a job post.
+
+    With a ModelRouter, the model comes from its "job_post" route instead of model.
+    """
+    request = {
+        "response_format": {"type": "json_object"},
+        "messages": [
+            {"role": "system", "content": REQUIREMENTS_SYSTEM_PROMPT},
+            {"role": "user", "content": normalize_job_post(text)}
+        ],
+    }
+    with metrics.timer("llm_job_post_summary") as counters:
+        if router is not None:
+            completion = router.create(client, "job_post", **request)
+        else:
+            completion = client.chat.completions.create(model=model, **request)
+        if completion.usage is not None:
+            counters["prompt_tokens"] = completion.usage.prompt_tokens
+            counters["completion_tokens"] = completion.usage.completion_tokens
+    result = json.loads(completion.choices[0].message.content)
+    return {
+        "skills": [str(skill).strip() for skill in result.get("skills", [])][:MAX_SKILLS],
+        "seniority": str(result.get("seniority", "")).strip(),
+        "responsibilities": [str(item).strip() for item in result.get("responsibilities", [])][:MAX_RESPONSIBILITIES],
+    }
+
+
+def format_requirements(requirements):
+    """Formats the requirements as the compact text that replaces the job post in the prompt."""
+    parts = []
+    if requirements["skills"]:
+        parts.append("required skills: " + ", ".join(requirements["skills"]))
+    if requirements["seniority"]:
+        parts.append("seniority: " + requirements["seniority"])
+    if requirements["responsibilities"]:
+        parts.append("key responsibilities: " + "; ".join(requirements["responsibilities"]))
+    return "; ".join(parts)
+
+
+def candidate_phrases(*texts):
+    """Splits free-form skills and experience into short phrases to match."""
+    phrases = []
+    for text in texts:
+        phrases += [p.strip() for p in re.split(r"[,;\n]|\band\b", text or "") if p.strip()]
+    return phrases
+
+
+@functools.lru_cache(maxsize=None)
+def _embedding_model(name):
+    # Imported on first use: sentence-transformers loads torch, which is slow and only needed for matching
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError: # Fall back to keyword matching
+        return None
+    try:
+        return SentenceTransformer(name)
+    except Exception: # The model can't be downloaded
+        return None
+
+
+class JobPost:
+    """The preprocessed form of one posting, shared by every interview for it."""
+
+    def __init__(self, key, requirements):
+        self.key = key
+        self.requirements = requirements
+        self.summary = format_requirements(requirements)
+        self._skill_embeddings = None
+        self._lock = threading.Lock()
+
+    def match_candidate(self, skills, experience):
+        """Splits the required skills into the ones the candidate covers and the gaps.
+
+        Uses local sentence embeddings when sentence-transformers is installed (the
+        embeddings of the requirements are computed once per posting), and keyword
+        overlap otherwise. Never calls the API.
+        """
+        required = self.requirements["skills"]
+        phrases = candidate_phrases(skills, experience)
+        if not required or not phrases:
+            return {"matched": [], "gaps": list(required), "method": "none"}
+
+        model = _embedding_model(EMBEDDING_MODEL)
+        if model is not None:
+            with self._lock:
+                if self._skill_embeddings is None:
+                    self._skill_embeddings = model.encode(required, normalize_embeddings=True)
+            candidate_embeddings = model.encode(phrases, normalize_embeddings=True)
+            similarities = (self._skill_embeddings @ candidate_embeddings.T).max(axis=1)
+            covered = [similarity >= SKILL_MATCH_THRESHOLD for similarity in similarities]
+            method = "embeddings"
+        else:
+            candidate_words = set(re.findall(r"\w+", " ".join(phrases).casefold()))
+            covered = [bool(set(re.findall(r"\w+", skill.casefold())) & candidate_words) for skill in required]
+            method = "keywords"
+        return {
+            "matched": [skill for skill, is_covered in zip(required, covered) if is_covered],
+            "gaps": [skill for skill, is_covered in zip(required, covered) if not is_covered],
+            "method": method,
+        }
+
+
+class JobPostCache:
+    """Process-wide cache of preprocessed job posts, keyed by the normalized posting.
+
+    The requirements of a posting are extracted with one LLM call, the first time
+    any candidate uses it; concurrent sessions for the same posting share that call.
+    """
+
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES, model="gpt-4o-mini"):
+        self.max_entries = max_entries
+        self.model = model
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get_or_extract(self, client, text, router=None):
+        """Returns the JobPost for the posting, extracting its requirements on a miss."""
+        key = job_post_key(text)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            future = self._in_flight.get(key)
+            if future is None:
+                self.misses += 1
+                future = self._in_flight[key] = Future()
+                owner = True
+            else:
+                self.hits += 1
+                owner = False
+        if not owner:
+            return future.result()
+
+        try:
+            job_post = JobPost(key, extract_requirements(client, text, self.model, router))
+        except Exception as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._entries[key] = job_post
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._in_flight.pop(key, None)
+        future.set_result(job_post)
+        return job_post
@@ -0,0 +1,119 @@
+import json
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# Latency samples kept per stage for the percentiles; older samples are dropped
+MAX_SAMPLES_PER_STAGE = 10000
+
+QUANTILES = (0.5, 0.95, 0.99)
+QUANTILE_KEYS = tuple(f"p{int(quantile * 100)}" for quantile in QUANTILES)
+
+
+def percentile(sorted_samples, quantile):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples) - 1, max(0, math.ceil(quantile * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+class MetricsRegistry:
+    """Process-wide latency and volume metrics per pipeline stage.
+
+    Each stage keeps its recent durations for p50/p95/p99 plus running totals of
+    counters such as tokens or bytes, aggregated across all sessions.
+    """
+
+    def __init__(self, max_samples=MAX_SAMPLES_PER_STAGE):
+        self.max_samples = max_samples
+        self._samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self._counts = defaultdict(int)
+        self._sums = defaultdict(float)
+        self._errors = defaultdict(int)
+        self._counters = defaultdict(lambda: defaultdict(float))
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, error=False, **counters):
+        """Records one duration for the stage, with optional counters (e.g. tokens=..., bytes=...)."""
+        with self._lock:
+            self._samples[stage].append(seconds)
+            self._counts[stage] += 1
+            self._sums[stage] += seconds
+            if error:
+                self._errors[stage] += 1
+            for name, value in counters.items():
+                if value is not None:
+                    self._counters[stage][name] += value
+
+    @contextmanager
+    def timer(self, stage, **counters):
+        """Times the block. Counters can be set on the yielded dict before the block ends."""
+        counters = dict(counters)
+        start = time.perf_counter()
+        error = False
+        try:
+            yield counters
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start, error=error, **counters)
+
+    def summary(self):
+        """Returns {stage: {count, errors, sum, p50, p95, p99, <counter totals>}}, durations in seconds."""
+        with self._lock:
+            stages = {}
+            for stage, samples in self._samples.items():
+                sorted_samples = sorted(samples)
+                stats = {"count": self._counts[stage], "errors": self._errors[stage], "sum": self._sums[stage]}
+                for quantile, key in zip(QUANTILES, QUANTILE_KEYS):
+                    stats[key] = percentile(sorted_samples, quantile)
+                stats.update(self._counters[stage])
+                stages[stage] = stats
+            return stages
+
+    def to_prometheus(self, prefix="interview_bot"):
+        """Exports the metrics in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {prefix}_stage_seconds Duration of each pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        # Each counter is its own metric family, declared once with all its stages together
+        counter_families = defaultdict(list)
+        for stage, stats in sorted(self.summary().items()):
+            for quantile, key in zip(QUANTILES, QUANTILE_KEYS):
+                value = stats[key] if stats[key] is not None else "NaN"
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {value}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {stats["sum"]}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+            counter_families["errors"].append((stage, stats["errors"]))
+            for name, value in stats.items():
+                if name not in ("count", "errors", "sum") + QUANTILE_KEYS:
+                    counter_families[name].append((stage, value))
+        for name, samples in counter_families.items():
+            lines.append(f"# TYPE {prefix}_stage_{name}_total counter")
+            lines.extend(f'{prefix}_stage_{name}_total{{stage="{stage}"}} {value}' for stage, value in samples)
+        return "\n".join(lines) + "\n"
+
+    def to_json_lines(self):
+        """Exports one JSON object per stage, stamped with the export time."""
+        timestamp = time.time()
+        return "".join(
+            json.dumps({"timestamp": timestamp, "stage": stage, **stats}) + "\n"
+            for stage, stats in sorted(self.summary().items())
+        )
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self._sums.clear()
+            self._errors.clear()
+            self._counters.clear()
+
+
+# Shared by every session of the server process
+metrics = MetricsRegistry()
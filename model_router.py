@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import defaultdict, deque
+
+from metrics import metrics, percentile
+
+# USD per million (input, output) tokens, for the cost report
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+}
+
+# Latency samples kept per stage and model
+LATENCY_WINDOW = 50
+# Samples needed before a model's measured latency counts against the latency budget
+MIN_LATENCY_SAMPLES = 5
+# Samples older than this are dropped, so a model demoted for being slow gets tried again
+LATENCY_MAX_AGE = 300.0
+# A model that failed is tried last for this long
+FAILURE_COOLDOWN = 60.0
+
+
+def call_cost(model, usage):
+    """Returns the USD cost of a call from its token usage, or None for models without a price."""
+    if usage is None or model not in MODEL_PRICES:
+        return None
+    input_price, output_price = MODEL_PRICES[model]
+    return (usage.prompt_tokens * input_price + usage.completion_tokens * output_price) / 1_000_000
+
+
+class ModelRouter:
+    """Chooses the model for each LLM stage and falls back to the next one on errors.
+
+    routes maps a stage ("follow_up", "evaluation", "feedback", "summary", "job_post")
+    to a rule: {"models": [...], "timeout": seconds, "latency_budget": seconds}.
+    Models are tried in the listed order. With a latency_budget, models whose measured
+    p95 latency for the stage is over budget move behind the ones within it, until their
+    samples age out after latency_max_age and they get measured again; a model that
+    just failed moves to the end for a cooldown. Every attempt but the last uses
+    the rule's timeout and no SDK retries, so a slow or failing model falls back quickly.
+    """
+
+    def __init__(self, routes, latency_window=LATENCY_WINDOW, failure_cooldown=FAILURE_COOLDOWN, latency_max_age=LATENCY_MAX_AGE):
+        self.routes = routes
+        self.failure_cooldown = failure_cooldown
+        self.latency_max_age = latency_max_age
+        # (stage, model) -> deque of (recorded_at, seconds), oldest first
+        self._latencies = defaultdict(lambda: deque(maxlen=latency_window))
+        self._failed_at = {}
+        self._usage = defaultdict(lambda: {"calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0})
+        self._lock = threading.Lock()
+
+    @classmethod
+    def single(cls, **stage_models):
+        """A router that always uses one model per stage, e.g. single(follow_up="gpt-4o")."""
+        return cls({stage: {"models": [model]} for stage, model in stage_models.items()})
+
+    def candidates(self, stage):
+        """The models to try for the stage, best first."""
+        route = self.routes[stage]
+        now = time.monotonic()
+        with self._lock:
+            cooling = [m for m in route["models"] if now - self._failed_at.get(m, float("-inf")) < self.failure_cooldown]
+            models = [m for m in route["models"] if m not in cooling]
+            budget = route.get("latency_budget")
+            if budget is not None:
+                within_budget = [m for m in models if (self._p95(stage, m) or 0.0) <= budget]
+                # Over-budget models stay available as fallbacks, fastest first
+                over_budget = sorted((m for m in models if m not in within_budget), key=lambda m: self._p95(stage, m))
+                models = within_budget + over_budget
+        return models + cooling
+
+    def attempts(self, client, stage):
+        """Yields (model, client) pairs to try in order; only the last one keeps the client's retries and timeout."""
+        models = self.candidates(stage)
+        timeout = self.routes[stage].get("timeout")
+        for index, model in enumerate(models):
+            if index < len(models) - 1:
+                yield model, client.with_options(max_retries=0, **({"timeout": timeout} if timeout else {}))
+            else:
+                yield model, client
+
+    def create(self, client, stage, **request):
+        """Runs a non-streaming chat completion for the stage, falling back through its models."""
+        last_error = None
+        for model, attempt_client in self.attempts(client, stage):
+            started_at = time.perf_counter()
+            try:
+                completion = attempt_client.chat.completions.create(model=model, **request)
+            except Exception as e:
+                self.record(stage, model, time.perf_counter() - started_at, error=True)
+                last_error = e
+                continue
+            self.record(stage, model, time.perf_counter() - started_at, usage=completion.usage)
+            return completion
+        raise last_error
+
+    def record(self, stage, model, seconds, usage=None, error=False):
+        """Records one call: its latency (the first token, for streams), token usage and cost."""
+        cost = call_cost(model, usage)
+        with self._lock:
+            totals = self._usage[model]
+            totals["calls"] += 1
+            if error:
+                totals["errors"] += 1
+                self._failed_at[model] = time.monotonic()
+            else:
+                self._latencies[(stage, model)].append((time.monotonic(), seconds))
+                self._failed_at.pop(model, None)
+            if usage is not None:
+                totals["prompt_tokens"] += usage.prompt_tokens
+                totals["completion_tokens"] += usage.completion_tokens
+            if cost is not None:
+                totals["cost_usd"] += cost
+        metrics.observe(
+            f"model_{model}",
+            seconds,
+            error=error,
+            prompt_tokens=usage.prompt_tokens if usage else None,
+            completion_tokens=usage.completion_tokens if usage else None,
+            cost_usd=cost,
+        )
+
+    def stats(self):
+        """Returns per-model totals and per-stage p50/p95 latency."""
+        with self._lock:
+            models = {model: dict(totals) for model, totals in self._usage.items()}
+            for stage, model in list(self._latencies):
+                samples = self._fresh_latencies(stage, model)
+                if not samples:
+                    continue
+                sorted_samples = sorted(samples)
+                models.setdefault(model, {})[f"{stage}_p50"] = percentile(sorted_samples, 0.5)
+                models[model][f"{stage}_p95"] = percentile(sorted_samples, 0.95)
+            return models
+
+    def _p95(self, stage, model):
+        samples = self._fresh_latencies(stage, model)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        return percentile(sorted(samples), 0.95)
+
+    def _fresh_latencies(self, stage, model):
+        """Drops the stage's samples for the model older than latency_max_age and returns the rest. Call with the lock held."""
+        samples = self._latencies.get((stage, model))
+        if not samples:
+            return []
+        expire_before = time.monotonic() - self.latency_max_age
+        while samples and samples[0][0] < expire_before:
+            samples.popleft()
+        return [seconds for _, seconds in samples]
@@ -0,0 +1,40 @@
+import functools
+
+# Connection pool shared by all sessions of the server process
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 60.0
+
+# Streaming replies and TTS can take a while, but connecting should be fast
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 60.0
+
+# Retries use the SDK's exponential backoff with jitter on connection errors, 408, 409, 429 and 5xx
+MAX_RETRIES = 3
+
+
+@functools.lru_cache(maxsize=None)
+def get_openai_client(api_key, base_url=None):
+    """Returns the process-wide OpenAI client for the given key and base URL.
+
+    The client is created once and reused, so its keep-alive connection pool survives
+    Streamlit reruns. Pass base_url to point the app at a local stand-in server.
+    """
+    # The SDK takes about a second to import, so it is loaded with the first client instead of at startup
+    import httpx
+    from openai import DefaultHttpxClient, OpenAI
+
+    http_client = DefaultHttpxClient(
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+    )
+    return OpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        http_client=http_client,
+        timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        max_retries=MAX_RETRIES,
+    )
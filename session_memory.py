@@ -0,0 +1,181 @@
+import hashlib
+import sys
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Optional
+
+# Interviews without any activity for this long are evicted
+DEFAULT_SESSION_TTL = 30 * 60
+# Minimum time between two sweeps for idle interviews
+DEFAULT_SWEEP_INTERVAL = 60
+
+PROFILE_FIELDS = ("name", "experience", "skills", "company", "position", "job_post")
+
+
+class SharedText:
+    """A text stored once for all sessions that use it."""
+
+    __slots__ = ("text", "digest", "__weakref__")
+
+    def __init__(self, text, digest):
+        self.text = text
+        self.digest = digest
+
+
+class SharedTextStore:
+    """Interns long texts, such as job posts, so sessions with the same text share one copy.
+
+    Entries are held weakly and disappear once no session references them.
+    """
+
+    def __init__(self):
+        self._entries = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def intern(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            shared = self._entries.get(digest)
+            if shared is None:
+                shared = SharedText(text, digest)
+                self._entries[digest] = shared
+            return shared
+
+
+# Shared by every session of the server process
+job_posts = SharedTextStore()
+
+
+@dataclass
+class CandidateProfile:
+    """The setup inputs of an interview; the job post is shared with other sessions."""
+
+    __slots__ = PROFILE_FIELDS
+    name: str
+    experience: str
+    skills: str
+    company: str
+    position: str
+    job_post: Optional[SharedText]
+
+    @classmethod
+    def from_inputs(cls, inputs):
+        """Builds the profile from a mapping of the setup inputs (a dict or st.session_state)."""
+        job_post = inputs.get("job_post") or ""
+        return cls(
+            name=inputs.get("name", ""),
+            experience=inputs.get("experience", ""),
+            skills=inputs.get("skills", ""),
+            company=inputs.get("company", ""),
+            position=inputs.get("position", ""),
+            job_post=job_posts.intern(job_post) if job_post else None,
+        )
+
+    @property
+    def job_post_text(self):
+        return self.job_post.text if self.job_post else ""
+
+    def to_inputs(self):
+        """Returns the setup inputs as a dict, e.g. to pre-fill the setup form again."""
+        inputs = {field: getattr(self, field) for field in PROFILE_FIELDS}
+        inputs["job_post"] = self.job_post_text
+        return inputs
+
+
+@dataclass
+class Turn:
+    """One message of the interview conversation."""
+
+    __slots__ = ("role", "content", "audio_key")
+    role: str
+    content: str
+    audio_key: str # "" when the message has no stored audio
+
+    def to_message(self):
+        """Returns the message in the chat completions format."""
+        return {"role": self.role, "content": self.content}
+
+
+def text_bytes(texts):
+    """Approximate memory held by the given strings."""
+    return sum(sys.getsizeof(text) for text in texts)
+
+
+class SessionRegistry:
+    """Tracks the live interviews of the server process and evicts idle ones.
+
+    Interviews are held weakly, so a session that Streamlit drops is still freed
+    normally. An interview without activity for longer than the TTL, for example
+    because its browser tab was closed mid-interview, is expired: its audio and
+    conversation are released even though its session state may still exist.
+
+    Each interview also has an owner, the browser session driving it. Resuming an
+    interview that is still live hands it to the new session instead of starting a
+    second engine on the same saved log; the previous owner sees it lost the interview.
+    """
+
+    def __init__(self, ttl=DEFAULT_SESSION_TTL, sweep_interval=DEFAULT_SWEEP_INTERVAL):
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._sessions = weakref.WeakSet()
+        self._owners = weakref.WeakKeyDictionary()
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def register(self, session, owner=None):
+        with self._lock:
+            self._sessions.add(session)
+            self._owners[session] = owner
+
+    def claim(self, interview_id, owner):
+        """Makes owner the owner of the live interview with this ID and returns it, or None if it is not live."""
+        with self._lock:
+            for session in self._sessions:
+                if session.interview_id == interview_id and not session.expired:
+                    self._owners[session] = owner
+                    return session
+        return None
+
+    def owner(self, session):
+        """The owner the interview was registered or last claimed with; None once it was expired."""
+        with self._lock:
+            return self._owners.get(session)
+
+    def sweep(self, now=None):
+        """Expires the interviews idle for longer than the TTL and returns how many were expired."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._last_sweep = now
+            idle = [s for s in self._sessions if now - s.last_active > self.ttl]
+            for session in idle:
+                self._sessions.discard(session)
+                self._owners.pop(session, None)
+        for session in idle:
+            session.expire()
+        return len(idle)
+
+    def sweep_if_due(self):
+        """Sweeps at most once per sweep interval; cheap enough to call on every rerun."""
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            return self.sweep()
+        return 0
+
+    def stats(self):
+        """Returns the number of live interviews and their approximate memory use."""
+        with self._lock:
+            sessions = list(self._sessions)
+        total_bytes = sum(s.memory_usage()["total_bytes"] for s in sessions)
+        return {
+            "sessions": len(sessions),
+            "total_bytes": total_bytes,
+            "bytes_per_session": total_bytes / len(sessions) if sessions else 0,
+            "shared_job_posts": len(job_posts),
+        }
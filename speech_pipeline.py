@@ -0,0 +1,126 @@
+import asyncio
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# A sentence ends at ., ! or ? (optionally followed by closing quotes/brackets) and whitespace, or at a line break
+SENTENCE_BOUNDARY = re.compile(r"[.!?]+[\"')\]]*\s+|\n+")
+
+# Sentences shorter than this are merged with the next one, so TTS isn't called for fragments like "Hi."
+MIN_SENTENCE_CHARS = 20
+
+
+class SentenceSplitter:
+    """Incrementally splits streamed text into complete sentences."""
+
+    def __init__(self, min_chars=MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def push(self, chunk):
+        """Adds a text chunk and returns the sentences it completed."""
+        self._buffer += chunk
+        sentences = []
+        start = 0
+        for match in SENTENCE_BOUNDARY.finditer(self._buffer):
+            if match.end() - start >= self.min_chars:
+                sentence = self._buffer[start:match.end()].strip()
+                if sentence:
+                    sentences.append(sentence)
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self):
+        """Returns whatever text is left as the final sentence."""
+        sentence = self._buffer.strip()
+        self._buffer = ""
+        return [sentence] if sentence else []
+
+
+def split_sentences(text_chunks, min_chars=MIN_SENTENCE_CHARS):
+    """Yields complete sentences from a stream of text chunks as soon as they end."""
+    splitter = SentenceSplitter(min_chars)
+    for chunk in text_chunks:
+        yield from splitter.push(chunk)
+    yield from splitter.flush()
+
+
+class SpeechPipeline:
+    """Synthesizes speech sentence by sentence while the text is still being generated.
+
+    Sentences are sent to the synthesize callable on a worker pool as soon as they are
+    complete, and the resulting audio segments are handed out in sentence order. A
+    sentence that fails to synthesize is skipped and its error kept in errors, so the
+    text stream is never interrupted by a TTS failure.
+    """
+
+    def __init__(self, synthesize, max_workers=3):
+        self._synthesize = synthesize
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts_pipeline")
+        self._splitter = SentenceSplitter()
+        self._pending = deque()
+        self.segments = []
+        self.errors = []
+
+    def push(self, chunk):
+        """Adds a streamed text chunk, submitting each completed sentence for synthesis."""
+        for sentence in self._splitter.push(chunk):
+            self._submit(sentence)
+
+    def finish(self):
+        """Submits the trailing text once the stream has ended."""
+        for sentence in self._splitter.flush():
+            self._submit(sentence)
+
+    def ready_segments(self):
+        """Yields the audio segments that are ready, in order, without blocking."""
+        while self._pending and self._pending[0].done():
+            segment = self._collect(self._pending.popleft())
+            if segment is not None:
+                yield segment
+
+    def remaining_segments(self):
+        """Yields all outstanding audio segments in order, waiting for each to finish."""
+        try:
+            while self._pending:
+                segment = self._collect(self._pending.popleft())
+                if segment is not None:
+                    yield segment
+        finally:
+            self.close()
+
+    async def remaining_segments_async(self):
+        """Async variant of remaining_segments that awaits each segment instead of blocking the event loop."""
+        try:
+            while self._pending:
+                future = self._pending.popleft()
+                await asyncio.wait([asyncio.wrap_future(future)]) # Waits without raising; _collect handles errors
+                segment = self._collect(future)
+                if segment is not None:
+                    yield segment
+        finally:
+            self.close()
+
+    def audio_bytes(self):
+        """Returns all segments joined into a single clip."""
+        return b"".join(self.segments)
+
+    def close(self):
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._executor.shutdown(wait=False)
+
+    def _submit(self, sentence):
+        self._pending.append(self._executor.submit(self._synthesize, sentence))
+
+    def _collect(self, future):
+        """Returns the segment of a finished sentence, or None if its synthesis failed."""
+        try:
+            segment = future.result()
+        except Exception as e:
+            self.errors.append(e)
+            return None
+        self.segments.append(segment)
+        return segment
@@ -0,0 +1,256 @@
+import functools
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from metrics import metrics
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_CACHE_ENTRIES = 256
+
+# Long recordings are transcribed in chunks of this length, which overlap so no word is cut in half
+CHUNK_SECONDS = 20
+CHUNK_OVERLAP_SECONDS = 2
+# Longest repeated run of words looked for where two chunks meet
+MAX_OVERLAP_WORDS = 12
+
+
+def audio_hash(audio_bytes):
+    return hashlib.sha256(audio_bytes).hexdigest()
+
+
+def _normalized_words(text):
+    return [re.sub(r"\W+", "", word).casefold() for word in text.split()]
+
+
+def merge_overlap(previous, following):
+    """Joins the transcripts of two overlapping chunks, dropping the words the second one repeats.
+
+    Whisper may transcribe the overlap slightly differently (a cut-off first word,
+    capitalization, punctuation), so words are compared normalized and the repeated
+    run may start a couple of words into the second chunk.
+    """
+    if not previous:
+        return following
+    previous_words = _normalized_words(previous)
+    following_words = following.split()
+    normalized_following = _normalized_words(following)
+    for size in range(min(MAX_OVERLAP_WORDS, len(previous_words), len(following_words)), 1, -1):
+        tail = previous_words[-size:]
+        for start in range(min(3, len(following_words) - size + 1)):
+            if normalized_following[start:start + size] == tail:
+                return " ".join([previous] + following_words[start + size:])
+    return " ".join(text for text in (previous, following) if text)
+
+
+def stitch_transcripts(texts):
+    return functools.reduce(merge_overlap, texts, "")
+
+
+def _copy_outcome(source, target):
+    if source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+class ChunkedTranscription:
+    """Transcript of a recording that is transcribed in overlapping chunks.
+
+    Works like a Future for the full text, and also exposes the text of the leading
+    chunks that are already transcribed, so it can be shown while the rest runs.
+    """
+
+    def __init__(self):
+        self._chunks = Future() # Resolves to the ordered list of chunk futures
+
+    def done(self):
+        if not self._chunks.done():
+            return False
+        return self._chunks.exception() is not None or all(f.done() for f in self._chunks.result())
+
+    def result(self, timeout=None):
+        """Waits for every chunk and returns the stitched transcript."""
+        return stitch_transcripts([f.result(timeout) for f in self._chunks.result(timeout)])
+
+    def partial_text(self):
+        """The stitched transcript of the chunks done so far, up to the first unfinished one."""
+        if not self._chunks.done() or self._chunks.exception() is not None:
+            return ""
+        texts = []
+        for future in self._chunks.result():
+            if not future.done() or future.exception() is not None:
+                break
+            texts.append(future.result())
+        return stitch_transcripts(texts)
+
+    def wait_next(self, timeout=None):
+        """Waits until one more leading chunk is transcribed; raises if it failed."""
+        chunk_futures = self._chunks.result(timeout)
+        for future in chunk_futures:
+            if not future.done():
+                future.result(timeout)
+                return
+
+
+class TranscriptionService:
+    """Transcribes in-memory audio clips on a bounded worker pool.
+
+    Clips are sent to Whisper directly as named in-memory buffers. With preprocess
+    enabled, silence is trimmed and the clip is re-encoded as 16 kHz mono Opus first.
+    Transcripts are cached by content hash, and a clip that is already being
+    transcribed shares the in-flight request instead of starting a new one. Long
+    recordings can be split into overlapping chunks that are transcribed concurrently.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, cache_entries=DEFAULT_CACHE_ENTRIES, model="whisper-1", preprocess=True):
+        self.model = model
+        self.cache_entries = cache_entries
+        self.preprocess = preprocess
+        self._reports = OrderedDict() # Preprocessing reports (bytes and durations before/after) by content hash
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="transcription")
+        self._cache = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, client, audio_bytes, file_name="audio.webm"):
+        """Starts transcribing the clip and returns a Future with the transcript text."""
+        return self._submit(client, audio_bytes, file_name, self.preprocess)
+
+    def submit_chunked(self, client, audio_bytes, file_name="audio.webm"):
+        """Starts transcribing the recording in overlapping chunks and returns a ChunkedTranscription.
+
+        Short recordings, and recordings that can't be preprocessed, are sent as one chunk,
+        so the time from the end of the recording to the first text is bounded by one chunk.
+        """
+        transcription = ChunkedTranscription()
+        key = audio_hash(audio_bytes)
+        with self._lock:
+            cached_text = self._cache.get(key)
+        if cached_text is not None:
+            transcription._chunks.set_result([self._submit(client, audio_bytes, file_name, False)])
+        else:
+            self._executor.submit(self._split_and_submit, transcription, client, key, audio_bytes, file_name)
+        return transcription
+
+    def _submit(self, client, audio_bytes, file_name, preprocess):
+        key = audio_hash(audio_bytes)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                future = Future()
+                future.set_result(self._cache[key])
+                return future
+            if key in self._in_flight:
+                return self._in_flight[key]
+            future = self._executor.submit(self._transcribe, client, key, audio_bytes, file_name, preprocess)
+            self._in_flight[key] = future
+            return future
+
+    def transcribe(self, client, audio_bytes, file_name="audio.webm"):
+        """Transcribes the clip and waits for the result."""
+        return self.submit(client, audio_bytes, file_name).result()
+
+    def preprocess_report(self, key):
+        """Returns the preprocessing report of a transcribed clip by its audio_hash, or None."""
+        with self._lock:
+            return self._reports.get(key)
+
+    def _split_and_submit(self, transcription, client, key, audio_bytes, file_name):
+        # Imported here, so numpy is only loaded once there is a recording to preprocess
+        from audio_preprocessing import ENCODED_FILE_EXTENSION, prepare_samples, split_samples
+        try:
+            samples = None
+            if self.preprocess:
+                started_at = time.perf_counter()
+                samples, report = prepare_samples(audio_bytes)
+                with self._lock:
+                    self._reports[key] = report
+            if samples is None:
+                transcription._chunks.set_result([self._submit(client, audio_bytes, file_name, False)])
+                return
+            chunks = split_samples(samples, CHUNK_SECONDS, CHUNK_OVERLAP_SECONDS)
+            # The first chunk is encoded before the chunks are handed out, so a recording that can't
+            # be encoded at all (e.g. ffmpeg without libopus) is still uploaded as it was recorded
+            first_clip = self._encode_chunk(chunks[0])
+        except Exception:
+            if samples is not None:
+                report["output_seconds"] = report["input_seconds"]
+            transcription._chunks.set_result([self._submit(client, audio_bytes, file_name, False)])
+            return
+        report["chunks"] = len(chunks)
+        report["output_bytes"] = 0
+        metrics.observe(
+            "audio_preprocessing",
+            time.perf_counter() - started_at,
+            input_bytes=report["input_bytes"],
+            input_audio_seconds=report["input_seconds"],
+            output_audio_seconds=report["output_seconds"],
+        )
+
+        chunk_futures = [Future() for _ in chunks]
+        transcription._chunks.set_result(chunk_futures)
+        self._cache_when_done(key, chunk_futures)
+        # Each chunk is uploaded as soon as it is encoded, so the first text doesn't wait for the rest
+        base_name = os.path.splitext(file_name)[0]
+        for index, (chunk, chunk_future) in enumerate(zip(chunks, chunk_futures)):
+            try:
+                clip = first_clip if index == 0 else self._encode_chunk(chunk)
+            except Exception as e:
+                for remaining_future in chunk_futures[index:]:
+                    remaining_future.set_exception(e)
+                return
+            with self._lock:
+                report["output_bytes"] += len(clip)
+            request = self._executor.submit(self._request, client, clip, f"{base_name}_{index}.{ENCODED_FILE_EXTENSION}")
+            request.add_done_callback(functools.partial(_copy_outcome, target=chunk_future))
+
+    def _encode_chunk(self, chunk):
+        from audio_preprocessing import encode_opus
+        with metrics.timer("audio_chunk_encoding") as counters:
+            clip = encode_opus(chunk)
+            counters["output_bytes"] = len(clip)
+        return clip
+
+    def _cache_when_done(self, key, chunk_futures):
+        """Caches the stitched transcript of the whole recording once every chunk succeeded."""
+        def on_chunk_done(_):
+            if all(f.done() and f.exception() is None for f in chunk_futures):
+                self._store(key, stitch_transcripts([f.result() for f in chunk_futures]))
+        for future in chunk_futures:
+            future.add_done_callback(on_chunk_done)
+
+    def _store(self, key, text):
+        with self._lock:
+            self._cache[key] = text
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+            while len(self._reports) > self.cache_entries:
+                self._reports.popitem(last=False)
+
+    def _request(self, client, audio_bytes, file_name):
+        audio_file = io.BytesIO(audio_bytes)
+        audio_file.name = file_name # Whisper infers the format from the file name
+        with metrics.timer("transcription", bytes=len(audio_bytes)):
+            return client.audio.transcriptions.create(model=self.model, file=audio_file).text
+
+    def _transcribe(self, client, key, audio_bytes, file_name, preprocess):
+        try:
+            if preprocess:
+                from audio_preprocessing import preprocess_audio
+                audio_bytes, file_extension, report = preprocess_audio(audio_bytes)
+                if file_extension:
+                    file_name = f"{os.path.splitext(file_name)[0]}.{file_extension}"
+                with self._lock:
+                    self._reports[key] = report
+            text = self._request(client, audio_bytes, file_name)
+            self._store(key, text)
+            return text
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
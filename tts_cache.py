@@ -0,0 +1,156 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from audio_store import AudioStore
+from metrics import metrics
+
+DEFAULT_MEMORY_BYTES = 32 * 1024 * 1024
+DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+DEFAULT_DISK_DIR = os.path.join(tempfile.gettempdir(), "interview_tts_cache")
+
+
+def normalize_text(text):
+    """Collapses whitespace so trivially different spellings of a prompt share an entry."""
+    return " ".join(text.split())
+
+
+def cache_key(model, voice, text):
+    payload = "\0".join([model, voice, normalize_text(text)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """Process-wide, content-addressed cache of synthesized speech.
+
+    Entries are keyed by (model, voice, normalized text). A size-bounded in-memory
+    tier sits in front of an on-disk tier; both evict least recently used entries.
+    The disk tier is listed once at startup and its size tracked on each write after
+    that. Set disk_dir to None to keep the cache in memory only.
+    """
+
+    def __init__(self, memory_bytes=DEFAULT_MEMORY_BYTES, disk_dir=DEFAULT_DISK_DIR, disk_bytes=DEFAULT_DISK_BYTES):
+        self._memory = AudioStore(byte_budget=memory_bytes)
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._disk_lock = threading.Lock()
+        self._disk_entries = OrderedDict() # Key -> file size, least recently used first
+        self.disk_total_bytes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    def get(self, model, voice, text):
+        """Returns the cached audio bytes, or None on a miss."""
+        key = cache_key(model, voice, text)
+        audio_bytes = self._memory.get(key)
+        if audio_bytes is not None:
+            self._count("memory_hits")
+            return audio_bytes
+        audio_bytes = self._read_disk(key)
+        if audio_bytes is not None:
+            self._memory.put(key, audio_bytes)
+            self._count("disk_hits")
+            return audio_bytes
+        self._count("misses")
+        return None
+
+    def put(self, model, voice, text, audio_bytes):
+        key = cache_key(model, voice, text)
+        self._memory.put(key, audio_bytes)
+        self._write_disk(key, audio_bytes)
+
+    def get_or_synthesize(self, model, voice, text, synthesize):
+        """Returns the cached audio, calling synthesize() and caching its result on a miss."""
+        audio_bytes = self.get(model, voice, text)
+        if audio_bytes is None:
+            audio_bytes = synthesize()
+            self.put(model, voice, text, audio_bytes)
+        return audio_bytes
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_bytes": self._memory.total_bytes,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self.disk_total_bytes,
+                "disk_entries": len(self._disk_entries),
+            }
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.mp3")
+
+    def _load_disk_index(self):
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".mp3"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-len(".mp3")], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk_entries[key] = size
+            self.disk_total_bytes += size
+        self._evict_disk()
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as cached_file:
+                audio_bytes = cached_file.read()
+            os.utime(path) # Mark as recently used, for the eviction order after a restart
+        except OSError:
+            with self._disk_lock: # Evicted, or removed by someone else
+                self.disk_total_bytes -= self._disk_entries.pop(key, 0)
+            return None
+        self._track_disk(key, len(audio_bytes))
+        return audio_bytes
+
+    def _write_disk(self, key, audio_bytes):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with metrics.timer("tts_cache_disk_write", bytes=len(audio_bytes)):
+                with open(temp_path, "wb") as cached_file:
+                    cached_file.write(audio_bytes)
+                os.replace(temp_path, path) # Atomic, so concurrent readers never see a partial file
+        except OSError:
+            return
+        self._track_disk(key, len(audio_bytes))
+        self._evict_disk()
+
+    def _track_disk(self, key, size):
+        """Records the file of key as the most recently used one."""
+        with self._disk_lock:
+            self.disk_total_bytes += size - self._disk_entries.pop(key, 0)
+            self._disk_entries[key] = size
+
+    def _evict_disk(self):
+        evicted = []
+        with self._disk_lock:
+            while self.disk_total_bytes > self.disk_bytes and self._disk_entries:
+                key, size = self._disk_entries.popitem(last=False)
+                self.disk_total_bytes -= size
+                evicted.append(key)
+        for key in evicted:
+            try:
+                os.remove(self._disk_path(key))
+            except OSError:
+                pass